@@ -1,41 +1,66 @@
+import logging
 import streamlit as st
-from moduls.carga import load_data_from_bucket
-from moduls.inscripciones import show_inscriptions
-from moduls.empresas import show_companies
-from moduls.respuestas import show_responses
+import pandas as pd
+from moduls.carga import BUCKET, BLOB_NAMES
+from moduls.refresco import Refrescador
+from moduls.vistas import select_view, render_view
+from moduls.instrumentacion import show_profiling_panel
 from google.oauth2 import service_account
 
 # Configuración de las credenciales
 credentials_info = st.secrets["GOOGLE_APPLICATION_CREDENTIALS_JSON"]
 credentials = service_account.Credentials.from_service_account_info(credentials_info)
 
+# Los DataFrames cargados se comparten entre sesiones: cualquier modificación
+# en una vista debe generar una copia en lugar de alterar el original
+pd.set_option("mode.copy_on_write", True)
+
 # Configuración de la página
 st.set_page_config(page_title="Reporte Empleo +26", layout="wide")
 
-# Nombres de los archivos en el bucket
-bucket_name = "direccion"
-blob_names = [
-    "vt_inscripciones_empleo.txt",     # DataFrame 0
-    "vt_empresas_adheridas.txt",        # DataFrame 1
-    "vt_reportes_ppp_mas26.txt",        # DataFrame 2
-    "vt_inscripciones_empleo_e26empr.txt", # DataFrame 3
-    "vt_respuestas.txt"                 # DataFrame 4
-]
-
-# Cargar datos desde el bucket
-dfs, file_dates = load_data_from_bucket(blob_names, bucket_name, credentials)
-
-# Crear las pestañas
-tab1, tab2, tab3 = st.tabs(["Inscripciones", "Empresas", "Respuestas"])
-
-with tab1:
-    # Mostrar inscripciones
-    show_inscriptions(dfs[0], dfs[2], dfs[3], file_dates[0], file_dates[2], file_dates[3])
-
-with tab2:
-    # Mostrar empresas
-    show_companies(dfs[1], dfs[2], file_dates[1])
-
-with tab3:
-    # Mostrar respuestas
-    show_responses(dfs[4], file_dates[4])
+# Segundos que espera una página si todavía no hay ninguna versión de los datos
+ESPERA_DATOS = 120
+
+# Mediciones (moduls.instrumentacion) y errores de la carga en la salida del servidor.
+# Se configura una sola vez por proceso, no en cada rerun.
+@st.cache_resource
+def configure_logging():
+    logger = logging.getLogger("moduls")
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    # Sin pasar por los handlers del logger raíz, para no duplicar líneas
+    logger.propagate = False
+    return logger
+
+configure_logging()
+
+# Un único hilo por proceso revisa el bucket y prepara los datos en segundo plano
+@st.cache_resource
+def get_refresher():
+    refrescador = Refrescador(BLOB_NAMES, BUCKET, credentials)
+    refrescador.start()
+    return refrescador
+
+# Se muestra siempre la última versión completa; solo el primer arranque, sin copia
+# local, tiene que esperar la primera descarga
+refrescador = get_refresher()
+if not refrescador.is_ready():
+    with st.spinner("Cargando datos..."):
+        datos = refrescador.current(timeout=ESPERA_DATOS)
+else:
+    datos = refrescador.current()
+if datos is None:
+    detalle = f": {refrescador.ultimo_error}" if refrescador.ultimo_error else ""
+    st.error(f"No se pudieron cargar los datos del bucket {BUCKET}{detalle}. Intente nuevamente en unos minutos.")
+    st.stop()
+dfs, file_dates = datos
+
+# Solo se calcula la vista elegida
+vista = select_view()
+render_view(vista, dfs, file_dates)
+
+# Panel de tiempos y memoria por etapa, solo con ?admin=1 en la URL
+if st.query_params.get("admin") == "1":
+    show_profiling_panel()
@@ -0,0 +1,103 @@
+import argparse
+import time
+from datetime import datetime, date
+
+import numpy as np
+import pandas as pd
+
+from moduls.agregados import adhesiones_cube, inscriptos_cube, headline_metrics, ZONAS_FAVORECIDAS
+
+# Compara el cálculo de métricas de show_inscriptions con máscaras booleanas
+# (como se hacía antes) contra los cubos diarios y headline_metrics.
+# Uso: python -m benchmarks.bench_metricas --filas 2000000
+
+DEPARTAMENTOS = ZONAS_FAVORECIDAS + ["CAPITAL", "COLON", "PUNILLA", "SANTA MARIA", "RIO CUARTO", "SAN JUSTO"]
+
+
+def synthetic_frames(filas, semilla=0):
+    rng = np.random.default_rng(semilla)
+    inicio = np.datetime64("2024-01-01")
+    df_inscripciones = pd.DataFrame({
+        "CUIL": rng.integers(20_000_000_000, 20_000_000_000 + filas // 2, filas),
+        "FEC_INSCRIPCION": (inicio + rng.integers(0, 365, filas).astype("timedelta64[D]")).astype("datetime64[ns]"),
+        "FEC_NACIMIENTO": (np.datetime64("1960-01-01") + rng.integers(0, 365 * 45, filas).astype("timedelta64[D]")).astype("datetime64[ns]"),
+        "N_DEPARTAMENTO": pd.Categorical(rng.choice(DEPARTAMENTOS, filas)),
+        "N_LOCALIDAD": pd.Categorical(rng.choice([f"LOCALIDAD {i}" for i in range(400)], filas)),
+    })
+    filas_inscriptos = filas // 2
+    df_inscriptos = pd.DataFrame({
+        "CUIL": rng.choice(df_inscripciones["CUIL"].to_numpy(), filas_inscriptos),
+        "ID_EST_FIC": rng.choice([3, 4, 8, 12], filas_inscriptos),
+        "FER_NAC": df_inscripciones["FEC_NACIMIENTO"].to_numpy()[:filas_inscriptos],
+        "FEC_SIST": df_inscripciones["FEC_INSCRIPCION"].to_numpy()[:filas_inscriptos],
+        "N_DEPARTAMENTO": pd.Categorical(rng.choice(DEPARTAMENTOS, filas_inscriptos)),
+    })
+    return df_inscripciones, df_inscriptos
+
+
+def mask_metrics(df_inscripciones, df_inscriptos, inicio, fin):
+    # Camino anterior: edades en días // 365 y un DataFrame filtrado por métrica
+    df_inscripciones = df_inscripciones.dropna(subset=['FEC_INSCRIPCION', 'FEC_NACIMIENTO'])
+    df_inscripciones = df_inscripciones[(df_inscripciones['FEC_INSCRIPCION'].dt.date >= inicio) &
+                                        (df_inscripciones['FEC_INSCRIPCION'].dt.date <= fin)]
+    df_cti = df_inscriptos[df_inscriptos['ID_EST_FIC'] == 12]
+    df_inscriptos = df_inscriptos[df_inscriptos['ID_EST_FIC'] == 8]
+    fecha_actual = pd.Timestamp(datetime.now())
+    edad = (fecha_actual - pd.to_datetime(df_inscripciones['FEC_NACIMIENTO'])).dt.days // 365
+    edad_inscriptos = (fecha_actual - df_inscriptos['FER_NAC']).dt.days // 365
+    return {
+        'adhesiones': df_inscripciones.shape[0],
+        'cuil_26_o_menos': df_inscripciones[edad <= 26]['CUIL'].nunique(),
+        'cuil_27_44': df_inscripciones[(edad > 26) & (edad < 45)]['CUIL'].nunique(),
+        'cuil_45_o_mas': df_inscripciones[edad >= 45]['CUIL'].nunique(),
+        'inscriptos': df_inscriptos.shape[0],
+        'inscriptos_45_o_mas': df_inscriptos[edad_inscriptos >= 45].shape[0],
+        'zonas_favorecidas': df_inscriptos[df_inscriptos['N_DEPARTAMENTO'].isin(ZONAS_FAVORECIDAS) & (edad_inscriptos < 45)].shape[0],
+        'match_unicos': df_inscriptos['CUIL'].nunique(),
+        'cti': df_cti['CUIL'].nunique(),
+    }
+
+
+def cube_metrics(df_inscripciones, df_inscriptos, inicio, fin, hoy):
+    cubo_adhesiones = adhesiones_cube(df_inscripciones, hoy)
+    cubo_inscriptos = inscriptos_cube(df_inscriptos, hoy)
+    return headline_metrics(cubo_adhesiones, cubo_inscriptos, inicio, fin), cubo_adhesiones, cubo_inscriptos
+
+
+def timed(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las métricas de Inscripciones")
+    parser.add_argument("--filas", type=int, default=2_000_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    df_inscripciones, df_inscriptos = synthetic_frames(args.filas)
+    hoy = date.today()
+    inicio, fin = date(2024, 3, 1), date(2024, 9, 30)
+    print(f"Filas: {args.filas:,} adhesiones / {len(df_inscriptos):,} inscriptos")
+
+    esperado, t_mascaras = timed(mask_metrics, df_inscripciones, df_inscriptos, inicio, fin)
+    (obtenido, cubo_adhesiones, cubo_inscriptos), t_cubos = timed(cube_metrics, df_inscripciones, df_inscriptos, inicio, fin, hoy)
+    if obtenido != esperado:
+        raise SystemExit(f"Los resultados no coinciden:\n{esperado}\n{obtenido}")
+
+    # Cambios de rango en la barra lateral: solo se consultan los cubos ya armados
+    t_consulta = []
+    for dias in np.linspace(30, 365, args.repeticiones).astype(int):
+        fin_rango = (np.datetime64("2024-01-01") + np.timedelta64(int(dias) - 1, "D")).astype(date)
+        _, segundos = timed(headline_metrics, cubo_adhesiones, cubo_inscriptos, date(2024, 1, 1), fin_rango)
+        t_consulta.append(segundos)
+
+    print(f"Máscaras booleanas (por render):      {t_mascaras * 1000:10.1f} ms")
+    print(f"Cubos + métricas (una vez por datos): {t_cubos * 1000:10.1f} ms")
+    print(f"Métricas con cubos ya armados:        {np.median(t_consulta) * 1000:10.1f} ms (mediana de {len(t_consulta)})")
+    print(f"Aceleración por render:               {t_mascaras / np.median(t_consulta):10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generador import generate_extracts
+from moduls import carga
+from moduls.almacenamiento_local import LocalStorageClient
+from moduls.cache import artefactos
+from moduls.instrumentacion import measurement_summary
+from moduls.vistas import VISTAS, render_view
+
+# Corre la carga y las vistas del tablero sin navegador contra extractos sintéticos
+# guardados en disco (LocalStorageClient en lugar del bucket) y reporta, por etapa,
+# latencia (p50/p95/máximo), filas por segundo y RSS máximo del proceso.
+# Uso: python -m benchmarks.bench_tablero --filas 1000000 [--json resultados.json]
+
+
+class MuestreoRSS(threading.Thread):
+    # Toma el RSS del proceso cada `intervalo` segundos; `pico()` devuelve el máximo
+    # desde el último `reiniciar()`
+    def __init__(self, intervalo=0.01):
+        super().__init__(daemon=True)
+        self.intervalo = intervalo
+        self._maximo = 0
+        self._fin = threading.Event()
+
+    def run(self):
+        while not self._fin.wait(self.intervalo):
+            self._maximo = max(self._maximo, carga.current_rss())
+
+    def reiniciar(self):
+        self._maximo = carga.current_rss()
+
+    def pico(self):
+        return max(self._maximo, carga.current_rss())
+
+    def detener(self):
+        self._fin.set()
+
+
+def run_stage(resultados, muestreo, etapa, filas, funcion, *args):
+    muestreo.reiniciar()
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    segundos = time.perf_counter() - inicio
+    resultados.append({"etapa": etapa, "segundos": segundos, "filas": filas, "pico_rss": muestreo.pico()})
+    return resultado
+
+
+def forget_memory():
+    # Como un proceso recién iniciado con la copia local ya en disco
+    carga.snapshots.clear()
+    carga._versiones.clear()
+    artefactos.clear()
+
+
+def run_benchmark(directorio, repeticiones):
+    cliente = LocalStorageClient(directorio)
+    cache_dir = os.path.join(directorio, "cache")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    resultados = []
+    muestreo = MuestreoRSS()
+    muestreo.start()
+    try:
+        cargar = lambda: carga.load_data_from_bucket(carga.BLOB_NAMES, carga.BUCKET, None, storage_client=cliente, cache_dir=cache_dir)
+        dfs, file_dates = run_stage(resultados, muestreo, "carga (desde el bucket)", None, cargar)
+        filas = sum(len(df) for df in dfs)
+        resultados[-1]["filas"] = filas
+        for _ in range(repeticiones):
+            forget_memory()
+            run_stage(resultados, muestreo, "carga (copia local)", filas, cargar)
+        for _ in range(repeticiones):
+            run_stage(resultados, muestreo, "carga (en memoria)", filas, cargar)
+
+        for nombre, vista in VISTAS.items():
+            filas_vista = sum(len(dfs[i]) for i in vista["extractos"])
+            # Primera vez: arma los artefactos de la versión de los datos
+            run_stage(resultados, muestreo, f"{nombre} (primera vez)", filas_vista, render_view, nombre, dfs, file_dates)
+            for _ in range(repeticiones):
+                run_stage(resultados, muestreo, f"{nombre} (rerun)", filas_vista, render_view, nombre, dfs, file_dates)
+    finally:
+        muestreo.detener()
+    return resultados
+
+
+def summarize(resultados):
+    df = pd.DataFrame(resultados)
+    resumen = df.groupby("etapa", sort=False).agg(
+        veces=("segundos", "count"),
+        p50_ms=("segundos", lambda s: np.percentile(s, 50) * 1000),
+        p95_ms=("segundos", lambda s: np.percentile(s, 95) * 1000),
+        max_ms=("segundos", lambda s: s.max() * 1000),
+        filas=("filas", "first"),
+        pico_rss_mb=("pico_rss", lambda s: s.max() / 2**20),
+    )
+    resumen["filas_por_s"] = resumen["filas"] / (resumen["p50_ms"] / 1000)
+    return resumen.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la carga y las vistas del tablero")
+    parser.add_argument("--filas", type=int, default=100_000, help="Adhesiones (10k a 10M); el resto de los extractos es proporcional")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--directorio", help="Carpeta para los extractos; si se omite se usa una temporal")
+    parser.add_argument("--json", help="Archivo donde guardar el resumen para comparar corridas")
+    args = parser.parse_args()
+
+    directorio = args.directorio or tempfile.mkdtemp(prefix="bench_tablero_")
+    try:
+        inicio = time.perf_counter()
+        cantidades = generate_extracts(directorio, args.filas)
+        print(f"Extractos generados en {time.perf_counter() - inicio:.1f} s: {sum(cantidades.values()):,} filas")
+
+        resumen = summarize(run_benchmark(directorio, args.repeticiones))
+        with pd.option_context("display.width", 200, "display.float_format", "{:,.1f}".format):
+            print(resumen.to_string(index=False))
+
+        # Etapas internas registradas por moduls.instrumentacion
+        internas = measurement_summary()
+        if not internas.empty:
+            with pd.option_context("display.width", 200, "display.float_format", "{:,.3f}".format):
+                print(internas.to_string(index=False))
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"filas": args.filas, "repeticiones": args.repeticiones,
+                           "etapas": resumen.to_dict(orient="records")}, f, ensure_ascii=False, indent=2)
+    finally:
+        if args.directorio is None:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
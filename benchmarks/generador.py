@@ -0,0 +1,116 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_metricas import DEPARTAMENTOS
+from moduls.carga import BUCKET
+
+# Genera extractos vt_* sintéticos con las columnas de carga.ESQUEMAS, escritos por
+# bloques para que 10M de filas no necesiten el archivo entero en memoria.
+# Uso: python -m benchmarks.generador --filas 1000000 --destino /tmp/bench
+
+BLOQUE = 500_000
+LOCALIDADES = [f"LOCALIDAD {i}" for i in range(400)]
+PUESTOS = ["CAJERO", "VENDEDOR", "ADMINISTRATIVO", "CHOFER", "OPERARIO", "RECEPCIONISTA", "COCINERO", "LIMPIEZA"]
+CATEGORIAS = ["COMERCIO", "INDUSTRIA", "SERVICIOS", "CONSTRUCCION"]
+ASPECTOS = ["APRENDER", "DECISIONES", "INFORMACION", "EXPLICAR", "HERRAMIENTAS", "CALCULO", "INSTRUCCIONES"]
+ESTADOS = [3, 4, 8, 12]
+CUIL_BASE = 20_000_000_000
+CUIT_BASE = 30_000_000_000
+
+
+def scaled_rows(filas):
+    # Filas de cada extracto en proporción a las adhesiones
+    return {
+        "vt_inscripciones_empleo.txt": filas,
+        "vt_empresas_adheridas.txt": max(filas // 20, 10),
+        "vt_reportes_ppp_mas26.txt": max(filas // 2, 1),
+        "vt_inscripciones_empleo_e26empr.txt": max(filas // 4, 1),
+        "vt_respuestas.txt": max(filas // 4, 1),
+    }
+
+
+def random_dates(rng, inicio, dias, n):
+    fechas = np.datetime64(inicio) + rng.integers(0, dias, n).astype("timedelta64[D]")
+    return np.datetime_as_string(fechas, unit="D")
+
+
+def block(blob_name, rng, n, desde, filas):
+    # Un bloque de `n` filas del extracto; `desde` es la posición de la primera fila
+    personas = max(filas // 2, 1)
+    empresas = max(filas // 60, 1)
+    nombres_empresas = lambda codigos: pd.Series(codigos).map("EMPRESA {}".format)
+    if blob_name == "vt_inscripciones_empleo.txt":
+        return pd.DataFrame({
+            "CUIL": CUIL_BASE + rng.integers(0, personas, n),
+            "FEC_INSCRIPCION": random_dates(rng, "2024-01-01", 365, n),
+            "FEC_NACIMIENTO": random_dates(rng, "1960-01-01", 365 * 45, n),
+            "N_DEPARTAMENTO": rng.choice(DEPARTAMENTOS, n),
+            "N_LOCALIDAD": rng.choice(LOCALIDADES, n),
+        })
+    if blob_name == "vt_empresas_adheridas.txt":
+        codigos = rng.integers(0, empresas, n)
+        return pd.DataFrame({
+            "CUIT": CUIT_BASE + codigos,
+            "N_EMPRESA": nombres_empresas(codigos),
+            "N_LOCALIDAD": rng.choice(LOCALIDADES, n),
+            "CANTIDAD_EMPLEADOS": rng.integers(1, 800, n),
+            "N_PUESTO_EMPLEO": rng.choice(PUESTOS, n),
+        })
+    if blob_name == "vt_reportes_ppp_mas26.txt":
+        codigos = rng.integers(0, empresas, n)
+        return pd.DataFrame({
+            "CUIL": CUIL_BASE + rng.integers(0, personas, n),
+            "CUIT": CUIT_BASE + codigos,
+            "ID_FICHA": np.arange(desde, desde + n),
+            "ID_EST_FIC": rng.choice(ESTADOS, n),
+            "FER_NAC": random_dates(rng, "1960-01-01", 365 * 45, n),
+            "FEC_SIST": random_dates(rng, "2024-01-01", 365, n),
+            "N_DEPARTAMENTO": rng.choice(DEPARTAMENTOS, n),
+            "RAZON_SOCIAL": nombres_empresas(codigos),
+        })
+    if blob_name == "vt_inscripciones_empleo_e26empr.txt":
+        return pd.DataFrame({
+            "CUIL": CUIL_BASE + rng.integers(0, personas, n),
+            "RAZON_SOCIAL": nombres_empresas(rng.integers(0, empresas, n)),
+        })
+    if blob_name == "vt_respuestas.txt":
+        df = pd.DataFrame({
+            "ID_INSCRIPCION": rng.integers(0, max(filas // 8, 1), n),
+            "CATEGORIA": rng.choice(CATEGORIAS, n),
+        })
+        for aspecto in ASPECTOS:
+            df[aspecto] = rng.integers(1, 6, n)
+        return df
+    raise ValueError(f"Extracto desconocido: {blob_name}")
+
+
+def generate_extracts(destino, filas, bucket_name=BUCKET, semilla=0):
+    # Escribe los cinco extractos en destino/bucket_name, la estructura que espera
+    # LocalStorageClient(destino). Devuelve las filas de cada uno.
+    rng = np.random.default_rng(semilla)
+    carpeta = os.path.join(destino, bucket_name)
+    os.makedirs(carpeta, exist_ok=True)
+    cantidades = scaled_rows(filas)
+    for blob_name, total in cantidades.items():
+        with open(os.path.join(carpeta, blob_name), "w", encoding="utf-8", newline="") as f:
+            for desde in range(0, total, BLOQUE):
+                n = min(BLOQUE, total - desde)
+                block(blob_name, rng, n, desde, filas).to_csv(f, index=False, header=desde == 0)
+    return cantidades
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera extractos vt_* sintéticos")
+    parser.add_argument("--filas", type=int, default=100_000, help="Adhesiones; el resto de los extractos es proporcional")
+    parser.add_argument("--destino", required=True)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+    for blob_name, total in generate_extracts(args.destino, args.filas, semilla=args.semilla).items():
+        print(f"{blob_name:40s} {total:12,d} filas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import numpy as np
+import pandas as pd
+from moduls.cache import snapshot_artifact, previous_artifact
+
+# Bandas de edad usadas en las métricas: 0 = 26 o menos, 1 = 27 a 44, 2 = 45 o más,
+# -1 = sin fecha de nacimiento
+BANDAS_EDAD = ["26 o menos", "27 a 44", "45 o más"]
+LIMITES_BANDAS = np.array([26, 44])
+
+ZONAS_FAVORECIDAS = [
+    'PRESIDENTE ROQUE SAENZ PEÑA',
+    'GENERAL ROCA',
+    "RIO SECO",
+    "TULUMBA",
+    "POCHO",
+    "SAN JAVIER",
+    "SAN ALBERTO",
+    "MINAS",
+    "CRUZ DEL EJE",
+    "TOTORAL",
+    "SOBREMONTE",
+    "ISCHILIN",
+]
+
+
+def to_day_numbers(fechas):
+    # Días desde 1970-01-01; NaT queda como el menor entero posible
+    return np.asarray(fechas, dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int64)
+
+
+def id_numbers(textos):
+    # Claves (CUIL, CUIT, ID) leídas como texto, como Int64. Se quitan los separadores
+    # ("20-12345678-9"); lo que no tiene dígitos o no es entero queda vacío.
+    textos = pd.Series(textos)
+    numeros = pd.to_numeric(textos, errors='coerce')
+    # Solo los valores que no son números simples pasan por la expresión regular
+    otros = numeros.isna() & textos.notna()
+    if otros.any():
+        numeros[otros] = pd.to_numeric(textos[otros].astype(str).str.replace(r'\D', '', regex=True), errors='coerce')
+    return numeros.where(numeros.isna() | (numeros % 1 == 0)).astype('Int64')
+
+
+def cuil_codes(cuiles):
+    # El CUIL como entero (sin guiones); -1 si falta. A diferencia de factorize, el
+    # código no depende de las filas, así los cubos de distintas partes se pueden unir
+    cuiles = pd.Series(cuiles)
+    if not pd.api.types.is_numeric_dtype(cuiles):
+        cuiles = id_numbers(cuiles)
+    return cuiles.fillna(-1).to_numpy(dtype=np.int64)
+
+
+def age_bands(fechas_nacimiento, hoy):
+    nacimiento = np.asarray(fechas_nacimiento, dtype='datetime64[ns]').astype('datetime64[D]')
+    edad = (np.datetime64(hoy, 'D') - nacimiento).astype(np.int64) // 365
+    bandas = np.searchsorted(LIMITES_BANDAS, edad, side='left').astype(np.int8)
+    bandas[np.isnat(nacimiento)] = -1
+    return bandas
+
+
+class CuboDiario:
+    # Conteos por (día, banda de edad, dimensiones) y pares (día, CUIL) sin repetir.
+    # Ambas tablas están ordenadas por día, así un rango de fechas es un corte
+    # contiguo y las consultas recorren solo los días pedidos. Al unir cubos los
+    # pares pueden repetirse, por eso los CUIL distintos se cuentan con np.unique.
+
+    def __init__(self, df, columna_fecha, columna_nacimiento, dimensiones, hoy, dimensiones_distintas=()):
+        base = pd.DataFrame({
+            'DIA': to_day_numbers(df[columna_fecha]),
+            'BANDA': age_bands(df[columna_nacimiento], hoy),
+        })
+        for col in dimensiones:
+            base[col] = df[col].reset_index(drop=True)
+        base['CUIL'] = cuil_codes(df['CUIL'])
+
+        agrupacion = ['DIA', 'BANDA'] + list(dimensiones)
+        self.celdas = (
+            base.groupby(agrupacion, observed=True, dropna=False, sort=False).size()
+            .reset_index(name='Conteo')
+            .sort_values('DIA', kind='stable', ignore_index=True)
+        )
+        self.pares = (
+            base[['DIA', 'BANDA', 'CUIL'] + list(dimensiones_distintas)].drop_duplicates()
+            .sort_values('DIA', kind='stable', ignore_index=True)
+        )
+        self._indexar()
+
+    def _indexar(self):
+        self._dias_celdas = self.celdas['DIA'].to_numpy()
+        self._dias_pares = self.pares['DIA'].to_numpy()
+        validos = self._dias_celdas[self._dias_celdas != np.iinfo(np.int64).min]
+        self.fecha_min = pd.Timestamp(validos[0], unit='D').date() if len(validos) else None
+        self.fecha_max = pd.Timestamp(validos[-1], unit='D').date() if len(validos) else None
+
+    def _cortar(self, tabla, dias, inicio, fin, filtros):
+        desde = 0 if inicio is None else np.searchsorted(dias, to_day_numbers([inicio])[0], side='left')
+        hasta = len(dias) if fin is None else np.searchsorted(dias, to_day_numbers([fin])[0], side='right')
+        tabla = tabla.iloc[desde:hasta]
+        if not filtros:
+            return tabla
+        mascara = np.ones(len(tabla), dtype=bool)
+        for col, valor in filtros.items():
+            if isinstance(valor, (list, tuple, set, np.ndarray, pd.Index)):
+                mascara &= tabla[col].isin(list(valor)).to_numpy()
+            else:
+                mascara &= (tabla[col] == valor).to_numpy()
+        return tabla[mascara]
+
+    def merge(self, otro):
+        # Cubo con las filas de ambos; las celdas se vuelven a sumar y los pares
+        # solo se concatenan
+        cubo = CuboDiario.__new__(CuboDiario)
+        agrupacion = [col for col in self.celdas.columns if col != 'Conteo']
+        cubo.celdas = (
+            pd.concat([self.celdas, otro.celdas], ignore_index=True)
+            .groupby(agrupacion, observed=True, dropna=False, sort=False)['Conteo'].sum()
+            .reset_index()
+            .sort_values('DIA', kind='stable', ignore_index=True)
+        )
+        cubo.pares = pd.concat([self.pares, otro.pares], ignore_index=True).sort_values('DIA', kind='stable', ignore_index=True)
+        cubo._indexar()
+        return cubo
+
+    def celdas_en(self, inicio=None, fin=None, **filtros):
+        return self._cortar(self.celdas, self._dias_celdas, inicio, fin, filtros)
+
+    def pares_en(self, inicio=None, fin=None, **filtros):
+        return self._cortar(self.pares, self._dias_pares, inicio, fin, filtros)
+
+    def conteo(self, inicio=None, fin=None, **filtros):
+        return int(self.celdas_en(inicio, fin, **filtros)['Conteo'].sum())
+
+    def distintos(self, inicio=None, fin=None, **filtros):
+        # Cantidad exacta de CUIL distintos en el rango
+        cuiles = self.pares_en(inicio, fin, **filtros)['CUIL'].to_numpy()
+        return int(np.unique(cuiles[cuiles >= 0]).size)
+
+    def serie(self, inicio=None, fin=None, **filtros):
+        celdas = self.celdas_en(inicio, fin, **filtros)
+        celdas = celdas[celdas['DIA'] != np.iinfo(np.int64).min]
+        serie = celdas.groupby('DIA', sort=True)['Conteo'].sum().reset_index()
+        return pd.DataFrame({
+            'Fecha': pd.to_datetime(serie['DIA'], unit='D').dt.date,
+            'Conteo': serie['Conteo'].to_numpy(),
+        })
+
+    def agrupar(self, columnas, inicio=None, fin=None, **filtros):
+        celdas = self.celdas_en(inicio, fin, **filtros)
+        return celdas.groupby(columnas, observed=True)['Conteo'].sum().reset_index()
+
+
+def incremental_cube(nombre, df, construir, hoy):
+    def constructor():
+        # Si solo se agregaron filas, se arma el cubo de esas filas y se une al anterior
+        previo, filas_base = previous_artifact(nombre, df, hoy)
+        if previo is not None:
+            return previo.merge(construir(df.iloc[filas_base:]))
+        return construir(df)
+    return snapshot_artifact(nombre, [df], constructor, hoy)
+
+
+def adhesiones_cube(df_inscripciones, hoy):
+    def construir(df):
+        df = df.dropna(subset=['FEC_INSCRIPCION', 'FEC_NACIMIENTO'])
+        dimensiones = [col for col in ['N_DEPARTAMENTO', 'N_LOCALIDAD'] if col in df.columns]
+        return CuboDiario(df, 'FEC_INSCRIPCION', 'FEC_NACIMIENTO', dimensiones, hoy)
+    return incremental_cube("cubo_adhesiones", df_inscripciones, construir, hoy)
+
+
+def inscriptos_cube(df_inscriptos, hoy):
+    def construir(df):
+        return CuboDiario(df, 'FEC_SIST', 'FER_NAC', ['N_DEPARTAMENTO', 'ID_EST_FIC'], hoy,
+                          dimensiones_distintas=['ID_EST_FIC'])
+    return incremental_cube("cubo_inscriptos", df_inscriptos, construir, hoy)
+
+
+def headline_metrics(cubo_adhesiones, cubo_inscriptos, inicio=None, fin=None):
+    # Todas las métricas principales de la pestaña en una pasada por cubo, sin
+    # armar DataFrames filtrados intermedios
+    celdas = cubo_adhesiones.celdas_en(inicio, fin)
+    pares = cubo_adhesiones.pares_en(inicio, fin)
+    cuil = pares['CUIL'].to_numpy(dtype=np.int64)
+    banda = pares['BANDA'].to_numpy()
+    validos = (cuil >= 0) & (banda >= 0)
+    # Cada CUIL se cuenta una vez por banda: clave = CUIL * 3 + banda
+    claves = np.unique(cuil[validos] * 3 + banda[validos])
+    cuiles_por_banda = np.bincount(claves % 3, minlength=3)
+
+    celdas_inscriptos = cubo_inscriptos.celdas
+    estado = celdas_inscriptos['ID_EST_FIC'].to_numpy()
+    banda_inscriptos = celdas_inscriptos['BANDA'].to_numpy()
+    conteo = celdas_inscriptos['Conteo'].to_numpy()
+    zona = celdas_inscriptos['N_DEPARTAMENTO'].isin(ZONAS_FAVORECIDAS).to_numpy()
+    match = estado == 8
+
+    pares_inscriptos = cubo_inscriptos.pares
+    cuil_inscriptos = pares_inscriptos['CUIL'].to_numpy(dtype=np.int64)
+    estado_pares = pares_inscriptos['ID_EST_FIC'].to_numpy()
+    seleccion = ((estado_pares == 8) | (estado_pares == 12)) & (cuil_inscriptos >= 0)
+    # clave = CUIL * 2 + (1 si es CTI)
+    claves_inscriptos = np.unique(cuil_inscriptos[seleccion] * 2 + (estado_pares[seleccion] == 12))
+    cuiles_por_estado = np.bincount(claves_inscriptos % 2, minlength=2)
+
+    return {
+        'adhesiones': int(celdas['Conteo'].sum()),
+        'cuil_26_o_menos': int(cuiles_por_banda[0]),
+        'cuil_27_44': int(cuiles_por_banda[1]),
+        'cuil_45_o_mas': int(cuiles_por_banda[2]),
+        'inscriptos': int(conteo[match].sum()),
+        'inscriptos_45_o_mas': int(conteo[match & (banda_inscriptos == 2)].sum()),
+        'zonas_favorecidas': int(conteo[match & zona & (banda_inscriptos >= 0) & (banda_inscriptos < 2)].sum()),
+        'match_unicos': int(cuiles_por_estado[0]),
+        'cti': int(cuiles_por_estado[1]),
+    }
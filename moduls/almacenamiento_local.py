@@ -0,0 +1,52 @@
+import os
+from datetime import datetime, timezone
+
+# Reemplazo local de google.cloud.storage.Client para pruebas y desarrollo:
+# cada bucket es una carpeta dentro de `root` y cada blob un archivo.
+
+
+class LocalBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.path = os.path.join(bucket.path, name)
+        self.generation = None
+        self.updated = None
+        self.size = None
+
+    def reload(self):
+        stat = os.stat(self.path)
+        self.generation = stat.st_mtime_ns
+        self.updated = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+        self.size = stat.st_size
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def open(self, mode="rb"):
+        return open(self.path, mode)
+
+
+class LocalBucket:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.path = os.path.join(client.root, name)
+
+    def blob(self, blob_name):
+        return LocalBlob(self, blob_name)
+
+    def get_blob(self, blob_name):
+        blob = self.blob(blob_name)
+        if not blob.exists():
+            return None
+        blob.reload()
+        return blob
+
+
+class LocalStorageClient:
+    def __init__(self, root):
+        self.root = root
+
+    def bucket(self, bucket_name):
+        return LocalBucket(self, bucket_name)
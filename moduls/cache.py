@@ -0,0 +1,86 @@
+import time
+import threading
+import pandas as pd
+from collections import OrderedDict
+
+# Caché en memoria compartida por todas las sesiones del proceso. Cada entrada
+# vence si no se usa durante `ttl` segundos y, si se supera `max_entries`, se
+# descarta la usada hace más tiempo.
+
+
+class SnapshotCache:
+    def __init__(self, ttl=3600, max_entries=20):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            self._evict()
+            entrada = self._entradas.get(key)
+            if entrada is None:
+                return None
+            entrada[1] = time.monotonic()
+            self._entradas.move_to_end(key)
+            return entrada[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entradas[key] = [value, time.monotonic()]
+            self._entradas.move_to_end(key)
+            self._evict()
+
+    def invalidate(self, match):
+        # Descarta las entradas cuya clave cumple la condición `match`
+        with self._lock:
+            for key in [k for k in self._entradas if match(k)]:
+                del self._entradas[key]
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entradas)
+
+    def _evict(self):
+        limite = time.monotonic() - self.ttl
+        for key in [k for k, (_, usado) in self._entradas.items() if usado < limite]:
+            del self._entradas[key]
+        while len(self._entradas) > self.max_entries:
+            self._entradas.popitem(last=False)
+
+
+# Resultados derivados de los extractos (cubos, índices, gráficos...). Se guardan
+# según la versión de los DataFrames de los que se calculan, así se recalculan
+# solo cuando cambian los datos.
+artefactos = SnapshotCache(ttl=6 * 3600, max_entries=100)
+
+
+def snapshot_key(df):
+    # Versión del extracto registrada por la carga; para DataFrames armados de otra
+    # forma, un hash de su contenido
+    if df.attrs.get("clave") is not None:
+        return (df.attrs.get("blob"), df.attrs["clave"])
+    return ("contenido", int(pd.util.hash_pandas_object(df, index=False).sum()))
+
+
+def snapshot_artifact(nombre, dfs, constructor, *extra):
+    key = (nombre, tuple(snapshot_key(df) for df in dfs)) + extra
+    valor = artefactos.get(key)
+    if valor is None:
+        valor = constructor()
+        artefactos.put(key, valor)
+    return valor
+
+
+def previous_artifact(nombre, df, *extra):
+    # Si la versión de `df` es la anterior más filas agregadas al final, devuelve el
+    # artefacto ya calculado para la anterior y la cantidad de filas que tenía
+    base = df.attrs.get("base")
+    if base is None:
+        return None, None
+    valor = artefactos.get((nombre, ((df.attrs.get("blob"), base),)) + extra)
+    return valor, df.attrs.get("filas_base")
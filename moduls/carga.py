@@ -1,34 +1,557 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import tempfile
 import os
+import io
+import json
+import shutil
+import sys
+import hashlib
+import logging
+import time
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 from google.cloud import storage
-from datetime import timedelta
+from pandas.tseries.api import guess_datetime_format
+from datetime import datetime, timedelta
+from collections import defaultdict
+from moduls.agregados import id_numbers
+from moduls.cache import SnapshotCache
+from moduls.instrumentacion import measure, instrumented
 
-def download_from_bucket(blob_name, bucket_name, credentials):
-    storage_client = storage.Client(credentials=credentials)
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(blob_name)
-    
-    blob.reload()
-    file_date = blob.updated
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as temp_file:
-        blob.download_to_filename(temp_file.name)
-        temp_file_name = temp_file.name
-    
-    file_date_adjusted = file_date - timedelta(hours=3)
-    return temp_file_name, file_date_adjusted
-
-def load_data_from_bucket(blob_names, bucket_name, credentials):
+logger = logging.getLogger(__name__)
+
+# Carpeta local donde se guarda la última copia de cada archivo del bucket
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "reporte_cache")
+# Segundos durante los cuales no se vuelve a consultar el bucket
+METADATA_TTL = 300
+MAX_WORKERS = 5
+# Tiempo sin uso tras el cual se libera un DataFrame y cantidad máxima en memoria
+SNAPSHOT_TTL = 6 * 3600
+SNAPSHOT_MAX_ENTRIES = 10
+# Bytes por lectura al verificar que el contenido ya ingerido no cambió
+BLOQUE_HUELLA = 8 * 1024 * 1024
+# Cantidad de partes Parquet a partir de la cual se compacta el snapshot
+MAX_PARTES = 20
+
+# Filas por bloque al leer un CSV: acota la memoria de la ingesta
+CHUNK_FILAS = 200_000
+
+# Valores no vacíos de una columna de fecha con los que se detecta su formato
+MUESTRA_FORMATO = 1000
+
+# Esquema de cada extracto: tipo de cada columna que usan las pestañas (el resto no se
+# lee), columnas de fecha que se convierten al ingerir con su formato (None: se detecta
+# una vez por archivo, ver detect_date_format) y si el archivo crece solo agregando
+# filas al final (ingesta incremental). Las columnas "category" se guardan como
+# diccionario de strings en el Parquet.
+ESQUEMAS = {
+    "vt_inscripciones_empleo.txt": {  # DataFrame 0
+        "tipos": {
+            "CUIL": "Int64",
+            "FEC_INSCRIPCION": "str",
+            "FEC_NACIMIENTO": "str",
+            "N_DEPARTAMENTO": "category",
+            "N_LOCALIDAD": "category",
+        },
+        "fechas": {"FEC_INSCRIPCION": None, "FEC_NACIMIENTO": None},
+        "incremental": True,
+    },
+    "vt_empresas_adheridas.txt": {  # DataFrame 1
+        "tipos": {
+            "CUIT": "Int64",
+            "N_EMPRESA": "str",
+            "N_LOCALIDAD": "category",
+            "CANTIDAD_EMPLEADOS": "float64",
+            "N_PUESTO_EMPLEO": "category",
+        },
+        "fechas": {},
+    },
+    "vt_reportes_ppp_mas26.txt": {  # DataFrame 2
+        "tipos": {
+            "CUIL": "Int64",
+            "CUIT": "Int64",
+            "ID_FICHA": "Int64",
+            "ID_EST_FIC": "Int64",
+            "FER_NAC": "str",
+            "FEC_SIST": "str",
+            "N_DEPARTAMENTO": "category",
+            "RAZON_SOCIAL": "category",
+        },
+        "fechas": {"FER_NAC": None, "FEC_SIST": None},
+        "incremental": True,
+    },
+    "vt_inscripciones_empleo_e26empr.txt": {  # DataFrame 3
+        "tipos": {
+            "CUIL": "Int64",
+            "RAZON_SOCIAL": "category",
+        },
+        "fechas": {},
+    },
+    "vt_respuestas.txt": {  # DataFrame 4
+        "tipos": {
+            "ID_INSCRIPCION": "Int64",
+            "CATEGORIA": "category",
+            "APRENDER": "float64",
+            "DECISIONES": "float64",
+            "INFORMACION": "float64",
+            "EXPLICAR": "float64",
+            "HERRAMIENTAS": "float64",
+            "CALCULO": "float64",
+            "INSTRUCCIONES": "float64",
+        },
+        "fechas": {},
+    },
+}
+
+# Bucket de los extractos y nombres de los archivos, en el orden de los DataFrames
+# (las vistas se refieren a ellos por posición). Definidos una sola vez aquí.
+BUCKET = "direccion"
+BLOB_NAMES = list(ESQUEMAS)
+
+# Una única copia de cada versión de cada extracto, compartida por todas las sesiones:
+# (bucket, blob, clave) -> DataFrame
+snapshots = SnapshotCache(ttl=SNAPSHOT_TTL, max_entries=SNAPSHOT_MAX_ENTRIES)
+# Última versión vista de cada blob: (bucket, blob) -> dict con clave, fecha y hora de consulta
+_versiones = {}
+_lock = threading.Lock()
+# Evita que dos sesiones lean a la vez el mismo extracto
+_locks_blob = defaultdict(threading.Lock)
+
+
+def blob_key(blob):
+    # La generación cambia cada vez que se sobrescribe el objeto en el bucket
+    return f"{blob.generation}-{blob.updated.isoformat()}"
+
+
+def snapshot_path(cache_dir, bucket_name, blob_name):
+    # Carpeta con una o más partes Parquet (las filas agregadas van en partes nuevas)
+    return os.path.join(cache_dir, bucket_name, blob_name + ".parquet")
+
+
+def read_snapshot_meta(ruta):
+    try:
+        with open(ruta + ".json", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def detect_date_format(valores):
+    # Formato que convierte más valores de la muestra; se prueba primero mes/día, como
+    # infiere pandas, y después día/mes. None si no se reconoce: pandas lo infiere en
+    # cada bloque, como antes.
+    muestra = valores.dropna().astype(str).head(MUESTRA_FORMATO)
+    mejor, convertidos = None, 0
+    for dayfirst in (False, True):
+        with warnings.catch_warnings():
+            # Aviso de pandas cuando el valor solo admite día/mes; se prueba igual
+            warnings.simplefilter("ignore", UserWarning)
+            formato = guess_datetime_format(muestra.iloc[0], dayfirst=dayfirst) if len(muestra) else None
+        if formato is None or formato == mejor:
+            continue
+        n = int(pd.to_datetime(muestra, format=formato, errors='coerce').notna().sum())
+        if n > convertidos:
+            mejor, convertidos = formato, n
+    # AAAA-MM-DD puede traer hora en otras filas del mismo archivo
+    if mejor is not None and mejor.startswith("%Y-%m-%d"):
+        return "ISO8601"
+    return mejor
+
+
+def parse_date_columns(df, esquema, formatos, invalidas):
+    # `formatos` guarda el formato detectado de cada columna en el primer bloque que
+    # tiene valores, así todos los bloques del archivo se convierten igual. `invalidas`
+    # acumula los valores no vacíos que quedaron como NaT.
+    for col, formato in esquema.get("fechas", {}).items():
+        if col not in df.columns:
+            continue
+        if formato is None:
+            if col not in formatos and df[col].notna().any():
+                formatos[col] = detect_date_format(df[col])
+            formato = formatos.get(col)
+        vacias = df[col].isna()
+        df[col] = pd.to_datetime(df[col], format=formato, errors='coerce')
+        perdidas = int((df[col].isna() & ~vacias).sum())
+        if perdidas:
+            invalidas[col] = invalidas.get(col, 0) + perdidas
+
+
+def parse_id_columns(df, esquema, invalidas):
+    # Las columnas Int64 se leen como texto: un valor con guiones o basura no debe
+    # abortar toda la ingesta. Los que no se pueden convertir quedan vacíos.
+    for col, tipo in esquema.get("tipos", {}).items():
+        if tipo != "Int64" or col not in df.columns:
+            continue
+        vacias = df[col].isna()
+        df[col] = id_numbers(df[col])
+        perdidas = int((df[col].isna() & ~vacias).sum())
+        if perdidas:
+            invalidas[col] = invalidas.get(col, 0) + perdidas
+
+
+def typed_table(df, esquema, schema=None, formatos=None, invalidas=None):
+    invalidas = {} if invalidas is None else invalidas
+    parse_id_columns(df, esquema, invalidas)
+    parse_date_columns(df, esquema, {} if formatos is None else formatos, invalidas)
+    # El texto se guarda siempre como string, aunque un bloque venga vacío
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].astype("string")
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    if schema is not None:
+        # Todos los bloques y partes deben tener exactamente el esquema del primero
+        return tabla.select(schema.names).cast(schema)
+    # Índices de diccionario de ancho fijo y valores string, para que todos los bloques
+    # compartan esquema aunque en el primero la columna venga toda vacía
+    campos = [
+        pa.field(campo.name, pa.dictionary(pa.int32(), pa.string())) if pa.types.is_dictionary(campo.type) else campo
+        for campo in tabla.schema
+    ]
+    return tabla.cast(pa.schema(campos, metadata=tabla.schema.metadata))
+
+
+def current_rss():
+    # Memoria residente del proceso en bytes
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    # Sin /proc (macOS): el máximo en lugar del actual. En Windows no hay resource.
+    try:
+        import resource
+    except ImportError:
+        return 0
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS lo informa en bytes; Linux en KB
+    return maximo if sys.platform == "darwin" else maximo * 1024
+
+
+class HuellaStream(io.RawIOBase):
+    # Envuelve el stream de descarga y registra el hash de todo lo leído y el tamaño,
+    # para la huella de la ingesta incremental, y el tiempo de lectura. `hash` permite
+    # continuar el hash de lo leído antes.
+    def __init__(self, stream, hash=None):
+        self.stream = stream
+        self.hash = hashlib.sha256() if hash is None else hash
+        self.ultimo = b""
+        self.tamano = 0
+        self.segundos = 0.0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        inicio = time.perf_counter()
+        datos = self.stream.read(len(buffer))
+        self.segundos += time.perf_counter() - inicio
+        n = len(datos)
+        buffer[:n] = datos
+        self.hash.update(datos)
+        if n:
+            self.ultimo = datos[-1:]
+        self.tamano += n
+        return n
+
+
+class CadenaStream(io.RawIOBase):
+    # Devuelve primero los bytes de `inicio` y después el contenido de `stream`
+    def __init__(self, inicio, stream):
+        self.inicio = inicio
+        self.stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.inicio:
+            n = min(len(buffer), len(self.inicio))
+            buffer[:n] = self.inicio[:n]
+            self.inicio = self.inicio[n:]
+            return n
+        return self.stream.readinto(buffer)
+
+
+def ingest_csv(stream, ruta_parquet, esquema, schema=None, formatos=None):
+    # Lee el CSV por bloques de CHUNK_FILAS filas y escribe cada bloque al Parquet,
+    # así la memoria depende del tamaño del bloque y no del archivo. Devuelve las
+    # filas escritas, la memoria del bloque más grande y el RSS máximo del proceso
+    # observado durante la ingesta (compartido con las demás descargas en curso), los
+    # segundos de conversión de tipos y de escritura del Parquet y los valores no
+    # vacíos que no se pudieron convertir, por columna. `formatos` (formato de fecha
+    # por columna) se completa con los detectados.
+    formatos = {} if formatos is None else formatos
+    invalidas = {}
+    tipos = esquema.get("tipos")
+    columnas = set(tipos) if tipos else None
+    if tipos:
+        # Las claves enteras se convierten después, en parse_id_columns
+        tipos = {col: "str" if tipo == "Int64" else tipo for col, tipo in tipos.items()}
+    filas = 0
+    pico_bloque = 0
+    pico_rss = current_rss()
+    segundos_tipos = 0.0
+    segundos_escritura = 0.0
+    writer = None
+    try:
+        bloques = pd.read_csv(stream, chunksize=CHUNK_FILAS, dtype=tipos,
+                              usecols=(lambda col: col in columnas) if columnas else None)
+        for bloque in bloques:
+            memoria_bloque = bloque.memory_usage(deep=True).sum()
+            inicio = time.perf_counter()
+            tabla = typed_table(bloque, esquema, schema, formatos, invalidas)
+            segundos_tipos += time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            if writer is None:
+                schema = tabla.schema
+                writer = pq.ParquetWriter(ruta_parquet, schema)
+            writer.write_table(tabla)
+            segundos_escritura += time.perf_counter() - inicio
+            filas += tabla.num_rows
+            pico_bloque = max(pico_bloque, memoria_bloque + tabla.nbytes)
+            pico_rss = max(pico_rss, current_rss())
+    finally:
+        if writer is not None:
+            writer.close()
+    return filas, {"pico_bloque": int(pico_bloque), "pico_rss": int(pico_rss),
+                   "segundos_tipos": round(segundos_tipos, 3), "segundos_escritura": round(segundos_escritura, 3),
+                   "invalidas": invalidas}
+
+
+def part_path(ruta, numero):
+    return os.path.join(ruta, f"part-{numero:05d}.parquet")
+
+
+def prefix_fingerprint(hash_prefijo, termina_en_linea):
+    # Huella del contenido ya ingerido: el hash de todos sus bytes. Una edición en
+    # cualquier fila ya ingerida (no solo en las últimas) obliga a recargar todo.
+    return {"prefijo": hash_prefijo.hexdigest(), "termina_en_linea": termina_en_linea}
+
+
+def schema_key(esquema):
+    # Si cambia el esquema de un extracto, la copia local ya no sirve
+    return hashlib.sha256(json.dumps(esquema, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def log_invalid(blob_name, invalidas):
+    # Las filas se conservan, pero esos valores quedan vacíos y no cuentan en las métricas
+    if invalidas:
+        logger.warning("Valores no convertidos en %s (quedan vacíos): %s", blob_name, invalidas)
+
+
+def write_snapshot_meta(ruta, blob, esquema, **datos):
+    with open(ruta + ".json", "w", encoding="utf-8") as f:
+        json.dump({"clave": blob_key(blob), "updated": blob.updated.isoformat(), "esquema": schema_key(esquema), **datos}, f)
+
+
+def download_from_bucket(blob, ruta, esquema):
+    # Se convierte en una carpeta temporal que luego se renombra, así nunca queda
+    # una copia a medias
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temp_dir = tempfile.mkdtemp(dir=os.path.dirname(ruta))
+    try:
+        with measure("ingesta", blob=blob.name) as medicion, blob.open("rb") as stream:
+            huella = HuellaStream(stream)
+            formatos = {}
+            filas, memoria = ingest_csv(io.BufferedReader(huella, buffer_size=1024 * 1024), part_path(temp_dir, 0), esquema, formatos=formatos)
+            medicion.update(filas=filas, bytes=huella.tamano, segundos_descarga=round(huella.segundos, 3), **memoria)
+        if os.path.exists(ruta):
+            shutil.rmtree(ruta)
+        os.replace(temp_dir, ruta)
+    finally:
+        if os.path.exists(temp_dir):
+            shutil.rmtree(temp_dir)
+    logger.info("Ingesta de %s: %d filas, %.1f MB, bloque máximo %.1f MB, RSS máximo %.1f MB",
+                blob.name, filas, huella.tamano / 2**20, memoria["pico_bloque"] / 2**20, memoria["pico_rss"] / 2**20)
+    log_invalid(blob.name, memoria["invalidas"])
+    write_snapshot_meta(ruta, blob, esquema, tamano=huella.tamano, filas=filas, partes=1, formatos=formatos, **memoria,
+                        **prefix_fingerprint(huella.hash, huella.ultimo == b"\n"))
+
+
+def append_from_bucket(blob, ruta, esquema, meta):
+    # Ingesta solo de las filas agregadas al final del archivo. Devuelve la tabla
+    # nueva, o None si el contenido ya ingerido cambió y hace falta recargar todo.
+    tamano = meta.get("tamano")
+    if (not tamano or not blob.size or blob.size <= tamano or not os.path.isdir(ruta)
+            or not meta.get("prefijo") or not meta.get("termina_en_linea")):
+        return None
+    # Se vuelve a leer (sin parsear) todo lo ya ingerido para compararlo con su hash;
+    # solo se parsean los bytes nuevos
+    hash_prefijo = hashlib.sha256()
+    cabecera = b""
+    leidos = 0
+    with blob.open("rb") as stream:
+        while leidos < tamano:
+            datos = stream.read(min(BLOQUE_HUELLA, tamano - leidos))
+            if not datos:
+                return None
+            hash_prefijo.update(datos)
+            if b"\n" not in cabecera:
+                cabecera += datos[:datos.find(b"\n") + 1] if b"\n" in datos else datos
+            leidos += len(datos)
+        if hash_prefijo.hexdigest() != meta["prefijo"]:
+            return None
+
+        # El resto del archivo se parsea por bloques a medida que se descarga, detrás
+        # de la cabecera, y se agrega al hash de lo ya ingerido
+        temp_parquet = ruta + ".tmp"
+        nuevos = HuellaStream(stream, hash_prefijo)
+        try:
+            with measure("ingesta_incremental", blob=blob.name) as medicion:
+                # Las filas nuevas se convierten con los formatos de fecha detectados al inicio
+                formatos = dict(meta.get("formatos", {}))
+                filas, memoria = ingest_csv(io.BufferedReader(CadenaStream(cabecera, nuevos), buffer_size=1024 * 1024),
+                                            temp_parquet, esquema, pq.read_schema(part_path(ruta, 0)), formatos)
+                medicion.update(filas=filas, bytes=nuevos.tamano, segundos_descarga=round(nuevos.segundos, 3), **memoria)
+        except (ValueError, KeyError, pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # Cambiaron las columnas o sus tipos: no se puede agregar como una parte más
+            if os.path.exists(temp_parquet):
+                os.remove(temp_parquet)
+            return None
+    tabla = pq.read_table(temp_parquet)
+
+    partes = meta.get("partes", 1)
+    if partes >= MAX_PARTES:
+        # Se compactan las partes para que la lectura no se degrade con el tiempo
+        compactado = ruta + ".compactado.tmp"
+        with pq.ParquetWriter(compactado, tabla.schema) as writer:
+            for numero in range(partes):
+                writer.write_table(pq.read_table(part_path(ruta, numero)))
+            writer.write_table(tabla)
+        os.remove(temp_parquet)
+        for numero in range(partes):
+            os.remove(part_path(ruta, numero))
+        os.replace(compactado, part_path(ruta, 0))
+        partes = 1
+    else:
+        # Se escribe fuera de la carpeta para que ninguna lectura vea la parte a medias
+        os.replace(temp_parquet, part_path(ruta, partes))
+        partes += 1
+    logger.info("Ingesta incremental de %s: %d filas nuevas, bloque máximo %.1f MB, RSS máximo %.1f MB",
+                blob.name, filas, memoria["pico_bloque"] / 2**20, memoria["pico_rss"] / 2**20)
+    log_invalid(blob.name, memoria["invalidas"])
+    write_snapshot_meta(ruta, blob, esquema, tamano=tamano + nuevos.tamano, filas=meta["filas"] + filas, partes=partes, formatos=formatos, **memoria,
+                        **prefix_fingerprint(hash_prefijo, nuevos.ultimo == b"\n"))
+    return tabla
+
+
+@instrumented("lectura_parquet")
+def read_snapshot(ruta, columnas=None):
+    # Solo se leen del Parquet las columnas pedidas que existan en el archivo. Sin los
+    # metadatos de pandas los enteros y el texto vuelven como en read_csv (int64 o
+    # float64 si hay vacíos, object) y los diccionarios como category.
+    schema = pq.read_schema(part_path(ruta, 0))
+    if columnas is not None:
+        columnas = [col for col in columnas if col in schema.names]
+    return pq.read_table(ruta, columns=columnas, schema=schema).to_pandas(ignore_metadata=True)
+
+
+def append_rows(df, nuevas):
+    # Une las categorías antes de concatenar para no perder el tipo category
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and isinstance(nuevas[col].dtype, pd.CategoricalDtype):
+            categorias = df[col].cat.categories.union(nuevas[col].cat.categories)
+            df = df.assign(**{col: df[col].cat.set_categories(categorias)})
+            nuevas = nuevas.assign(**{col: nuevas[col].cat.set_categories(categorias)})
+    return pd.concat([df, nuevas], ignore_index=True)
+
+
+def invalidate_blob(bucket_name, blob_name, conservar=None):
+    # Libera las versiones en memoria de un extracto, salvo la clave `conservar`
+    snapshots.invalidate(lambda key: key[:2] == (bucket_name, blob_name) and key[2] != conservar)
+
+
+def get_snapshot(bucket_name, blob_name, clave, cache_dir, blob=None):
+    key = (bucket_name, blob_name, clave)
+    esquema = ESQUEMAS.get(blob_name, {})
+    with _locks_blob[(bucket_name, blob_name)]:
+        df = snapshots.get(key)
+        if df is None:
+            ruta = snapshot_path(cache_dir, bucket_name, blob_name)
+            meta = read_snapshot_meta(ruta)
+            attrs = {"blob": blob_name, "clave": clave}
+            if meta.get("clave") != clave or meta.get("esquema") != schema_key(esquema) or not os.path.isdir(ruta):
+                if blob is None:
+                    return None
+                incremental = esquema.get("incremental") and meta.get("esquema") == schema_key(esquema)
+                nuevas = append_from_bucket(blob, ruta, esquema, meta) if incremental else None
+                if nuevas is None:
+                    download_from_bucket(blob, ruta, esquema)
+                else:
+                    # La versión nueva es la anterior más filas al final: se reutiliza lo
+                    # ya cargado y los agregados pueden actualizarse solo con esas filas
+                    attrs.update({"base": meta["clave"], "filas_base": meta["filas"]})
+                    anterior = snapshots.get((bucket_name, blob_name, meta["clave"]))
+                    if anterior is not None:
+                        df = append_rows(anterior, nuevas.select(list(anterior.columns)).to_pandas(ignore_metadata=True))
+            if df is None:
+                df = read_snapshot(ruta, list(esquema.get("tipos", {})) or None)
+            df.attrs = attrs
+            snapshots.put(key, df)
+    # Copia superficial: comparte los datos con la caché pero las vistas no pueden
+    # reemplazar columnas del original (con copy_on_write tampoco modificarlas)
+    return df.copy(deep=False)
+
+
+def load_blob(bucket, bucket_name, blob_name, cache_dir):
+    blob = bucket.get_blob(blob_name)
+    if blob is None:
+        raise FileNotFoundError(f"No se encontró {blob_name} en el bucket {bucket_name}")
+    clave = blob_key(blob)
+    file_date = blob.updated - timedelta(hours=3)
+
+    df = get_snapshot(bucket_name, blob_name, clave, cache_dir, blob)
+    # Si el objeto cambió en el bucket se descartan las versiones anteriores
+    invalidate_blob(bucket_name, blob_name, conservar=clave)
+    with _lock:
+        _versiones[(bucket_name, blob_name)] = {
+            "clave": clave,
+            "file_date": file_date,
+            "consultado": time.monotonic(),
+        }
+    return df, file_date
+
+
+@instrumented()
+def fetch_snapshots(bucket, bucket_name, blob_names, cache_dir):
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        resultados = list(executor.map(lambda blob_name: load_blob(bucket, bucket_name, blob_name, cache_dir), blob_names))
+    dfs = [df for df, _ in resultados]
+    file_dates = [file_date for _, file_date in resultados]
+    return dfs, file_dates
+
+
+def load_data_from_disk(blob_names, bucket_name, cache_dir=CACHE_DIR):
+    # Última versión guardada localmente, sin consultar el bucket. None si falta alguna.
     dfs = []
     file_dates = []
     for blob_name in blob_names:
-        temp_file_name, file_date = download_from_bucket(blob_name, bucket_name, credentials)
-        try:
-            df = pd.read_csv(temp_file_name, low_memory=False)
-            dfs.append(df)
-            file_dates.append(file_date)
-        finally:
-            os.remove(temp_file_name)  # Elimina el archivo temporal
+        meta = read_snapshot_meta(snapshot_path(cache_dir, bucket_name, blob_name))
+        if "clave" not in meta:
+            return None
+        df = get_snapshot(bucket_name, blob_name, meta["clave"], cache_dir)
+        if df is None:
+            return None
+        dfs.append(df)
+        file_dates.append(datetime.fromisoformat(meta["updated"]) - timedelta(hours=3))
     return dfs, file_dates
 
+
+@instrumented()
+def load_data_from_bucket(blob_names, bucket_name, credentials, storage_client=None, cache_dir=CACHE_DIR):
+    # Si todo se consultó hace poco, se responde desde memoria sin ir al bucket
+    ahora = time.monotonic()
+    with _lock:
+        recientes = [_versiones.get((bucket_name, blob_name)) for blob_name in blob_names]
+    if all(r is not None and ahora - r["consultado"] < METADATA_TTL for r in recientes):
+        dfs = [get_snapshot(bucket_name, blob_name, r["clave"], cache_dir) for blob_name, r in zip(blob_names, recientes)]
+        if all(df is not None for df in dfs):
+            return dfs, [r["file_date"] for r in recientes]
+
+    # Un único cliente compartido por todas las descargas
+    if storage_client is None:
+        storage_client = storage.Client(credentials=credentials)
+    bucket = storage_client.bucket(bucket_name)
+    return fetch_snapshots(bucket, bucket_name, blob_names, cache_dir)
@@ -1,50 +1,141 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
+import numpy as np
 import math
+import io
 from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from moduls.cache import snapshot_artifact
+from moduls.fichas import ESTADOS_FICHA
+from moduls.indices import key_index
+from moduls.instrumentacion import instrumented
+
+# Tramos de cupo según la cantidad de empleados: hasta 7 empleados el cupo es 2;
+# hasta 30, el 20 %; hasta 165, el 15 %; más de 165, el 10 %
+LIMITES_CUPO = np.array([7, 30, 165, 535])
+PORCENTAJES_CUPO = np.array([0.0, 0.2, 0.15, 0.1, 0.1])
+
+# Estados de las fichas que ocupan un lugar del cupo de la empresa. Solo cuenta
+# INSCRIPTO (ID_EST_FIC 8), el estado desde el que se pasa a FUERA_CUPO_EMPRESA. Las
+# fichas RECHAZADO, DUPLICADO, FUERA_CUPO_EMPRESA y las de CTI no ocupan cupo ni
+# son candidatas. Los códigos se toman de fichas.ESTADOS_FICHA.
+ESTADOS_CUPO = ["INSCRIPTO"]
+CODIGOS_CUPO = [codigo for codigo, estado in ESTADOS_FICHA.items() if estado in ESTADOS_CUPO]
+
+def calculate_cupos(cantidades_empleados):
+    cantidades = np.asarray(cantidades_empleados, dtype=float)
+    tramo = np.searchsorted(LIMITES_CUPO, cantidades, side='left')
+    cupos = np.floor(PORCENTAJES_CUPO[tramo] * cantidades)
+    cupos[tramo == 0] = 2
+    return cupos
 
 def calculate_cupo(cantidad_empleados):
-    if cantidad_empleados <= 7:
-        return math.floor(2)
-    elif cantidad_empleados <= 30:
-        return math.floor(0.2 * cantidad_empleados)
-    elif cantidad_empleados <= 165:
-        return math.floor(0.15 * cantidad_empleados)
-    elif cantidad_empleados <= 535:
-        return math.floor(0.1 * cantidad_empleados)
-    else:
-        return math.floor(0.1 * cantidad_empleados)
+    return math.floor(calculate_cupos([cantidad_empleados])[0])
+
+def quota_engine(df_empresas, df_inscriptos):
+    # Cupo de cada empresa contra sus fichas en ESTADOS_CUPO, calculado una vez por
+    # versión de los datos. Devuelve la tabla por empresa y las posiciones (en
+    # df_inscriptos) de las fichas que exceden el cupo, candidatas a FUERA_CUPO_EMPRESA.
+    def construir():
+        # Se une por CUIT si ambos extractos lo tienen; si no, por nombre de empresa
+        if 'CUIT' in df_inscriptos.columns:
+            clave_empresas, clave_inscriptos = 'CUIT', 'CUIT'
+        else:
+            clave_empresas, clave_inscriptos = 'N_EMPRESA', 'RAZON_SOCIAL'
+
+        # Las empresas sin clave no pueden tener fichas asociadas
+        empresas = df_empresas.dropna(subset=[clave_empresas]).drop_duplicates(clave_empresas)[
+            ['N_LOCALIDAD', 'CUIT', 'N_EMPRESA', 'CANTIDAD_EMPLEADOS']
+        ].reset_index(drop=True)
+        cupos = calculate_cupos(empresas['CANTIDAD_EMPLEADOS'])
+
+        # Índice hash de empresas: posición de la empresa de cada ficha (-1 si no está)
+        indice = pd.Index(empresas[clave_empresas])
+        posiciones = indice.get_indexer(df_inscriptos[clave_inscriptos])
+        posiciones[df_inscriptos[clave_inscriptos].isna().to_numpy()] = -1
+        fichas = df_inscriptos['ID_FICHA'].notna().to_numpy() if 'ID_FICHA' in df_inscriptos.columns else np.ones(len(posiciones), dtype=bool)
+        if 'ID_EST_FIC' in df_inscriptos.columns:
+            fichas &= df_inscriptos['ID_EST_FIC'].isin(CODIGOS_CUPO).to_numpy()
+        validas = np.flatnonzero((posiciones >= 0) & fichas)
+        inscriptos = np.bincount(posiciones[validas], minlength=len(empresas))
+
+        # Orden de llegada de cada ficha dentro de su empresa: las que superan el cupo
+        # son candidatas a quedar fuera
+        if 'FEC_SIST' in df_inscriptos.columns:
+            fechas = df_inscriptos['FEC_SIST'].to_numpy(dtype='datetime64[ns]')[validas]
+            orden = validas[np.lexsort((fechas, posiciones[validas]))]
+        else:
+            orden = validas[np.argsort(posiciones[validas], kind='stable')]
+        empresa_ordenada = posiciones[orden]
+        inicio_grupo = np.searchsorted(empresa_ordenada, empresa_ordenada, side='left')
+        llegada = np.arange(len(orden)) - inicio_grupo
+        fuera_cupo = orden[llegada >= cupos[empresa_ordenada]]
+
+        tabla = empresas.assign(
+            CUPO=pd.Series(cupos).astype('Int64'),
+            INSCRIPTOS=inscriptos,
+            CUPO_RESTANTE=pd.Series(cupos - inscriptos).astype('Int64'),
+        )
+        return tabla, np.sort(fuera_cupo)
+    return snapshot_artifact("cupos_empresas", [df_empresas, df_inscriptos], instrumented("cupos_empresas")(construir))
+
+@instrumented("nube_palabras")
+def wordcloud_png(word_freq):
+    # Figura propia (no la global de pyplot), así se libera al terminar
+    wordcloud = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(word_freq)
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    ax.imshow(wordcloud, interpolation='bilinear')
+    ax.axis("off")
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    return buffer.getvalue()
+
+def companies_charts(df_empresas):
+    # Top 10 de empresas y nube de palabras, calculados una vez por versión de los datos
+    def construir():
+        # Agrupamos los datos por empresa y puesto de empleo, sumando la cantidad de empleados
+        df_puesto_agg = df_empresas.groupby(['N_EMPRESA', 'N_PUESTO_EMPLEO'], observed=True).agg({'CANTIDAD_EMPLEADOS':'sum'}).reset_index()
+
+        # Filtramos para mostrar solo las 10 empresas con mayor cantidad de empleados
+        top_10_empresas = df_puesto_agg.groupby('N_EMPRESA')['CANTIDAD_EMPLEADOS'].sum().nlargest(10).index
+        df_puesto_agg_top10 = df_puesto_agg[df_puesto_agg['N_EMPRESA'].isin(top_10_empresas)]
+
+        # Agrupamos los datos por puesto de empleo y contamos las apariciones
+        conteo_puestos = df_empresas.groupby('N_PUESTO_EMPLEO', observed=True).size()
+        word_freq = {str(puesto): int(conteo) for puesto, conteo in conteo_puestos.items()}
+
+        return {
+            'top10': df_puesto_agg_top10,
+            'nube_png': wordcloud_png(word_freq) if word_freq else None,
+        }
+    return snapshot_artifact("graficos_empresas", [df_empresas], construir)
 
+@instrumented()
 def show_companies(df_empresas, df_inscriptos, file_date):
-    total_empresas = df_empresas['CUIT'].nunique()
-    # Agrupar y contar la cantidad de inscriptos por empresa
-    inscriptos_por_empresa = df_inscriptos.groupby('RAZON_SOCIAL')['ID_FICHA'].count().reset_index(name='Inscriptos')
-    inscriptos_por_empresa = inscriptos_por_empresa.sort_values(by='Inscriptos', ascending=False)
-    st.metric(label="Empresas Adheridas", value=total_empresas)
+    total_empresas = len(key_index(df_empresas, 'CUIT'))
+    # Cupo, inscriptos y cupo restante por empresa, y fichas que exceden el cupo
+    tabla_cupos, fuera_cupo = quota_engine(df_empresas, df_inscriptos)
 
-    # Calcular la columna 'CUPO'
-    df_empresas['CUPO'] = df_empresas['CANTIDAD_EMPLEADOS'].apply(calculate_cupo)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric(label="Empresas Adheridas", value=total_empresas)
+    with col2:
+        st.metric(label="Empresas con cupo completo", value=int((tabla_cupos['CUPO_RESTANTE'] <= 0).sum()))
+    with col3:
+        st.metric(label="Fichas fuera de cupo (candidatas)", value=len(fuera_cupo))
 
     # Mostrar la tabla con columnas de igual ancho
     st.subheader("Tabla de Inscriptos por Empresa")
-    #col1, col2 = st.columns(2)
-    #with col1:
-    #    st.dataframe(inscriptos_por_empresa, hide_index=True)
-    #with col1:
-    df_display = df_empresas[['N_LOCALIDAD','CUIT','N_EMPRESA', 'CANTIDAD_EMPLEADOS', 'CUPO']].drop_duplicates()
+    df_display = tabla_cupos.rename(columns={'INSCRIPTOS': 'Inscriptos', 'CUPO_RESTANTE': 'Cupo restante'})
     st.dataframe(df_display, hide_index=True)
 
     if not df_empresas.empty:
         st.subheader("Distribución de Empleados por Empresa y Puesto")
 
-        # Agrupamos los datos por empresa y puesto de empleo, sumando la cantidad de empleados
-        df_puesto_agg = df_empresas.groupby(['N_EMPRESA', 'N_PUESTO_EMPLEO']).agg({'CANTIDAD_EMPLEADOS':'sum'}).reset_index()
-
-        # Filtramos para mostrar solo las 10 empresas con mayor cantidad de empleados
-        top_10_empresas = df_puesto_agg.groupby('N_EMPRESA')['CANTIDAD_EMPLEADOS'].sum().nlargest(10).index
-        df_puesto_agg_top10 = df_puesto_agg[df_puesto_agg['N_EMPRESA'].isin(top_10_empresas)]
+        graficos = companies_charts(df_empresas)
+        df_puesto_agg_top10 = graficos['top10']
 
         # Creación del gráfico de barras apiladas
         stacked_bar_chart_2 = alt.Chart(df_puesto_agg_top10).mark_bar().encode(
@@ -56,19 +147,7 @@ def show_companies(df_empresas, df_inscriptos, file_date):
 
         st.altair_chart(stacked_bar_chart_2, use_container_width=True)
 
-        # Agrupamos los datos por puesto de empleo y contamos las apariciones
-        conteo_puestos = df_empresas.groupby('N_PUESTO_EMPLEO').size().reset_index(name='Conteo')
-
-        # Convertimos los datos en un diccionario para la nube de palabras
-        word_freq = dict(zip(conteo_puestos['N_PUESTO_EMPLEO'], conteo_puestos['Conteo']))
-
-        # Generamos la nube de palabras
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(word_freq)
-
-        # Mostramos la nube de palabras en Streamlit
-        st.subheader("Nube de Palabras de Apariciones por Puesto de Empleo")
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis("off")
-        st.pyplot(plt)
-
+        # Mostramos la nube de palabras (PNG ya generado) en Streamlit
+        if graficos['nube_png'] is not None:
+            st.subheader("Nube de Palabras de Apariciones por Puesto de Empleo")
+            st.image(graficos['nube_png'], use_column_width=True)
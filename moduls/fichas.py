@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+from moduls.agregados import cuil_codes
+from moduls.cache import snapshot_artifact
+
+# Código ID_EST_FIC de cada estado del ciclo de vida descripto en el README.
+# Solo están confirmados los que usa el tablero; los códigos que no figuran se
+# muestran como "ESTADO <código>" hasta que se agreguen aquí.
+ESTADOS_FICHA = {
+    8: "INSCRIPTO",
+    12: "CTI_INSCRIPTO",
+}
+
+# Transiciones del diagrama de estados del README
+TRANSICIONES = [
+    ("ADHERIDO", "INSCRIPTO"),
+    ("ADHERIDO", "INSCRIPTO_SIN_EMPRESA"),
+    ("ADHERIDO", "INSCRIPTO_NO_ACEPTADO"),
+    ("INSCRIPTO", "BENEFICIARIOS"),
+    ("INSCRIPTO", "FUERA_CUPO_EMPRESA"),
+    ("INSCRIPTO", "RECHAZADO"),
+    ("INSCRIPTO", "DUPLICADO"),
+    ("INSCRIPTO", "CTI_INSCRIPTO"),
+    ("CTI_INSCRIPTO", "CTI_VALIDADO"),
+    ("CTI_VALIDADO", "CTI_BENEFICIARIO"),
+    ("BENEFICIARIOS", "ACTIVO"),
+    ("BENEFICIARIOS", "RENUNCIA_PROGRAMA"),
+    ("BENEFICIARIOS", "BAJA_OFICIO"),
+    ("BENEFICIARIOS", "BAJA_EMPRESA"),
+    ("BENEFICIARIOS", "RETENIDO"),
+]
+
+ESTADOS_CICLO = list(dict.fromkeys(estado for transicion in TRANSICIONES for estado in transicion))
+
+# Fila del embudo con las fichas cuyo código no está en ESTADOS_FICHA
+SIN_MAPEAR = "SIN MAPEAR"
+
+
+def state_name(codigo):
+    return ESTADOS_FICHA.get(codigo, f"ESTADO {codigo}")
+
+
+def descendants(estado):
+    # Estados alcanzables desde `estado`, incluido él mismo
+    alcanzables = {estado}
+    pendientes = [estado]
+    while pendientes:
+        actual = pendientes.pop()
+        for origen, destino in TRANSICIONES:
+            if origen == actual and destino not in alcanzables:
+                alcanzables.add(destino)
+                pendientes.append(destino)
+    return alcanzables
+
+
+class IndiceEstados:
+    # Posiciones de las fichas agrupadas por estado: `orden` tiene las filas ordenadas
+    # por estado y `limites[i]:limites[i + 1]` es el tramo del estado i. Se arma una
+    # vez por versión de los datos y las consultas no vuelven a recorrer el DataFrame.
+
+    def __init__(self, df_inscriptos):
+        codigos, self.estados = pd.factorize(df_inscriptos['ID_EST_FIC'], sort=True)
+        validos = np.flatnonzero(codigos >= 0)
+        self.orden = validos[np.argsort(codigos[validos], kind='stable')]
+        self.limites = np.concatenate([[0], np.cumsum(np.bincount(codigos[validos], minlength=len(self.estados)))])
+        self._posicion_estado = {codigo: i for i, codigo in enumerate(self.estados)}
+
+        # Fichas y CUIL únicos por código de estado, fijos para esta versión
+        cuiles = cuil_codes(df_inscriptos['CUIL'])
+        distintos = []
+        for i in range(len(self.estados)):
+            tramo = cuiles[self.orden[self.limites[i]:self.limites[i + 1]]]
+            distintos.append(np.unique(tramo[tramo >= 0]).size)
+        self.resumen = pd.DataFrame({
+            'ID_EST_FIC': list(self.estados),
+            'Estado': [state_name(codigo) for codigo in self.estados],
+            'Fichas': np.diff(self.limites),
+            'CUIL únicos': np.array(distintos, dtype=np.int64),
+        })
+        self._fichas_por_estado = self.resumen.groupby('Estado')['Fichas'].sum()
+        self._sin_mapear = int(self.resumen.loc[~self.resumen['ID_EST_FIC'].isin(list(ESTADOS_FICHA)), 'Fichas'].sum())
+
+    def posiciones(self, codigo):
+        i = self._posicion_estado.get(codigo)
+        if i is None:
+            return np.array([], dtype=np.intp)
+        return self.orden[self.limites[i]:self.limites[i + 1]]
+
+    def funnel(self, adheridos=None):
+        # Fichas en cada estado del ciclo y fichas que lo alcanzaron (están en él o en
+        # un estado posterior). Las adhesiones vienen de otro extracto, por eso
+        # ADHERIDO se puede pasar aparte. Las fichas con códigos sin mapear no se
+        # ubican en el ciclo y van en una fila SIN_MAPEAR al final.
+        por_estado = self._fichas_por_estado
+        filas = []
+        for estado in ESTADOS_CICLO:
+            alcanzados = int(por_estado.reindex(list(descendants(estado)), fill_value=0).sum())
+            if estado == 'ADHERIDO' and adheridos is not None:
+                alcanzados = max(alcanzados, int(adheridos))
+            filas.append({'Estado': estado, 'Fichas': int(por_estado.get(estado, 0)), 'Alcanzados': alcanzados})
+        filas.append({'Estado': SIN_MAPEAR, 'Fichas': self._sin_mapear, 'Alcanzados': self._sin_mapear})
+        return pd.DataFrame(filas)
+
+    def conversions(self, adheridos=None):
+        # Tasa de conversión de cada transición: alcanzados del destino / del origen.
+        # Solo entre estados con código conocido: los demás siempre cuentan 0 y la
+        # tasa no sería real.
+        alcanzados = self.funnel(adheridos).set_index('Estado')['Alcanzados']
+        mapeados = set(ESTADOS_FICHA.values()) | ({'ADHERIDO'} if adheridos is not None else set())
+        filas = []
+        for origen, destino in TRANSICIONES:
+            if origen in mapeados and destino in mapeados and alcanzados[origen] > 0:
+                filas.append({
+                    'Origen': origen,
+                    'Destino': destino,
+                    'Tasa': alcanzados[destino] / alcanzados[origen],
+                })
+        return pd.DataFrame(filas, columns=['Origen', 'Destino', 'Tasa'])
+
+
+def ficha_states(df_inscriptos):
+    return snapshot_artifact("estados_fichas", [df_inscriptos], lambda: IndiceEstados(df_inscriptos))
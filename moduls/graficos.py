@@ -0,0 +1,67 @@
+import pandas as pd
+import streamlit as st
+from moduls.cache import snapshot_artifact
+
+# Datos de los gráficos con una cantidad acotada de puntos: las series por fecha se
+# agrupan por día, semana o mes según el rango, y las categorías se limitan a las
+# MAX_CATEGORIAS mayores más "OTROS". Las especificaciones Vega-Lite ya armadas se
+# guardan por versión de los datos y filtros, así el tamaño de lo que se envía al
+# navegador no crece con el historial.
+MAX_PUNTOS = 120
+MAX_CATEGORIAS = 30
+OTROS = "OTROS"
+
+# Frecuencia de pandas, unidad de los ejes de Vega-Lite y formato de la fecha
+FRECUENCIAS = {
+    "D": ("day", "%d/%m/%Y"),
+    "W": ("week", "%d/%m/%Y"),
+    "M": ("month", "%m/%Y"),
+}
+
+
+def time_bucket(inicio, fin):
+    # La frecuencia más fina que no supera MAX_PUNTOS puntos entre inicio y fin
+    dias = (pd.Timestamp(fin) - pd.Timestamp(inicio)).days + 1
+    if dias <= MAX_PUNTOS:
+        return "D"
+    if dias / 7 <= MAX_PUNTOS:
+        return "W"
+    return "M"
+
+
+def bucket_series(serie, frecuencia, columnas=()):
+    # Suma `Conteo` por período; `Fecha` queda como el primer día de cada período
+    if frecuencia == "D" or serie.empty:
+        return serie
+    periodo = pd.to_datetime(serie['Fecha']).dt.to_period(frecuencia).dt.start_time.dt.date
+    return (
+        serie.assign(Fecha=periodo)
+        .groupby(list(columnas) + ['Fecha'], sort=False, observed=True)['Conteo'].sum()
+        .reset_index()
+    )
+
+
+def top_categories(df, columna, valor, n=MAX_CATEGORIAS):
+    # Las n categorías con mayor `valor`; el resto se suma en OTROS
+    totales = df.groupby(columna, observed=True)[valor].sum().sort_values(ascending=False)
+    if len(totales) <= n:
+        return totales.reset_index()
+    principales = totales.iloc[:n]
+    otros = pd.Series([totales.iloc[n:].sum()], index=[OTROS])
+    resultado = pd.concat([principales.rename(index=str), otros])
+    return resultado.rename_axis(columna).reset_index(name=valor)
+
+
+def cached_spec(nombre, dfs, constructor, *filtros):
+    # Especificación Vega-Lite (dict, con los datos incluidos) del gráfico que arma
+    # `constructor`, calculada una vez por versión de `dfs` y filtros
+    def construir():
+        resultado = constructor()
+        if isinstance(resultado, dict):
+            return {clave: grafico.to_dict() for clave, grafico in resultado.items()}
+        return resultado.to_dict()
+    return snapshot_artifact("grafico_" + nombre, dfs, construir, *filtros)
+
+
+def show_spec(spec):
+    st.vega_lite_chart(spec, use_container_width=True)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from moduls.agregados import cuil_codes
+from moduls.cache import snapshot_artifact
+from moduls.fichas import ficha_states
+
+
+class IndiceClaves:
+    # Posiciones de las filas agrupadas por clave (CUIL, CUIT, ...): `claves` tiene las
+    # claves distintas ordenadas y `orden[limites[i]:limites[i + 1]]` son las filas de
+    # claves[i], en orden creciente. Las claves faltantes (-1) no se indexan.
+
+    def __init__(self, valores):
+        valores = cuil_codes(valores)
+        validos = np.flatnonzero(valores >= 0)
+        self.orden = validos[np.argsort(valores[validos], kind='stable')]
+        ordenados = valores[self.orden]
+        inicios = np.flatnonzero(np.r_[True, ordenados[1:] != ordenados[:-1]])[:len(ordenados)]
+        self.claves = ordenados[inicios]
+        self.limites = np.r_[inicios, len(ordenados)]
+
+    def __len__(self):
+        # Cantidad de claves distintas
+        return len(self.claves)
+
+    def _buscar(self, claves):
+        claves = cuil_codes(claves)
+        if not len(self.claves):
+            return np.zeros(len(claves), dtype=np.intp), np.zeros(len(claves), dtype=bool)
+        i = np.minimum(np.searchsorted(self.claves, claves), len(self.claves) - 1)
+        return i, self.claves[i] == claves
+
+    def contiene(self, claves):
+        return self._buscar(claves)[1]
+
+    def repeticiones(self):
+        # Cantidad de filas de cada clave, en el orden de `claves`
+        return np.diff(self.limites)
+
+
+def key_index(df, columna):
+    # Índice de `columna` en `df`, armado una vez por versión de los datos y
+    # compartido por todas las pestañas
+    if columna not in df.columns:
+        return IndiceClaves([])
+    return snapshot_artifact("indice_" + columna, [df], lambda: IndiceClaves(df[columna]))
+
+
+def duplicate_fichas(df_inscriptos):
+    # CUIL con más de una ficha: candidatos a DUPLICADO
+    indice = key_index(df_inscriptos, 'CUIL')
+    return pd.DataFrame({'CUIL': indice.claves, 'Fichas': indice.repeticiones()}).query('Fichas > 1')
+
+
+def match_without_adhesion(df_inscripciones, df_inscriptos, estado=8):
+    # CUIL con ficha en `estado` y cantidad de ellos que no figuran entre las adhesiones
+    def construir():
+        cuiles = np.unique(cuil_codes(df_inscriptos['CUIL'].iloc[ficha_states(df_inscriptos).posiciones(estado)]))
+        cuiles = cuiles[cuiles >= 0]
+        sin_adhesion = ~key_index(df_inscripciones, 'CUIL').contiene(cuiles)
+        return len(cuiles), int(sin_adhesion.sum())
+    return snapshot_artifact("match_sin_adhesion", [df_inscripciones, df_inscriptos], construir, estado)
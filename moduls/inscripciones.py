@@ -2,28 +2,47 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 from datetime import datetime
-import io
+from moduls.agregados import adhesiones_cube, inscriptos_cube, headline_metrics
+from moduls.fichas import ficha_states
+from moduls.cache import snapshot_artifact
+from moduls.indices import key_index, duplicate_fichas, match_without_adhesion
+from moduls.instrumentacion import measure, instrumented
+from moduls.graficos import FRECUENCIAS, time_bucket, bucket_series, top_categories, cached_spec, show_spec
+
+
+def datetime_columns(df, columnas):
+    # Convierte a datetime las columnas que no lo son, sin modificar el DataFrame
+    # recibido. Si ya lo son todas se devuelve el mismo DataFrame, sin copiarlo.
+    convertidas = {
+        col: pd.to_datetime(df[col], errors='coerce')
+        for col in columnas
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col])
+    }
+    return df.assign(**convertidas) if convertidas else df
+
+
+def parse_dates(df_inscripciones, df_inscriptos):
+    # Las fechas ya vienen convertidas desde la carga; esto solo cubre DataFrames
+    # armados de otra forma
+    return (
+        datetime_columns(df_inscripciones, ['FEC_INSCRIPCION', 'FEC_NACIMIENTO']),
+        datetime_columns(df_inscriptos, ['FER_NAC', 'FEC_SIST']),
+    )
 
 
+@instrumented()
 def show_inscriptions(df_inscripciones, df_inscriptos, df_empresas_seleccionadas, file_date_inscripciones, file_date_inscriptos, file_date_empresas):
-    # Convertir las fechas en inscripciones
-    if 'FEC_INSCRIPCION' in df_inscripciones.columns:
-        df_inscripciones['FEC_INSCRIPCION'] = pd.to_datetime(df_inscripciones['FEC_INSCRIPCION'], errors='coerce')
-    if 'FEC_NACIMIENTO' in df_inscripciones.columns:
-        df_inscripciones['FEC_NACIMIENTO'] = pd.to_datetime(df_inscripciones['FEC_NACIMIENTO'], errors='coerce')
-        df_inscripciones = df_inscripciones.dropna(subset=['FEC_INSCRIPCION', 'FEC_NACIMIENTO'])
-
-    # Convertir la columna FER_NAC en df_inscriptos a fecha
-    df_inscriptos['FER_NAC'] = pd.to_datetime(df_inscriptos['FER_NAC'], errors='coerce')
-    df_inscriptos['FEC_SIST'] = pd.to_datetime(df_inscriptos['FEC_SIST'], errors='coerce')
-    df_inscriptos = df_inscriptos.copy()  # Asegurarse de trabajar con una copia
-
-    # Filtrar solo los CTI
-    df_cti = df_inscriptos[df_inscriptos['ID_EST_FIC'] == 12]
-
-    # Filtrar solo los registros con ID_EST_FICHA = 8
-    df_inscriptos = df_inscriptos[df_inscriptos['ID_EST_FIC'] == 8]  
-    
+    # Las fechas ya vienen convertidas desde la carga; no se modifican los DataFrames
+    # recibidos porque son compartidos entre sesiones
+    with measure("conversion_fechas"):
+        df_inscripciones, df_inscriptos = parse_dates(df_inscripciones, df_inscriptos)
+
+    # Cubos diarios calculados una vez por versión de los datos; las métricas
+    # se obtienen sumando los días del rango elegido
+    hoy = datetime.now().date()
+    with measure("cubos"):
+        cubo_adhesiones = adhesiones_cube(df_inscripciones, hoy)
+        cubo_inscriptos = inscriptos_cube(df_inscriptos, hoy)
 
     # Pestaña inscripciones
     st.markdown("### Programas Empleo +26")
@@ -33,63 +52,39 @@ def show_inscriptions(df_inscripciones, df_inscriptos, df_empresas_seleccionadas
 
    
     # Filtros de fechas para inscripciones
-    if 'FEC_INSCRIPCION' in df_inscripciones.columns:
+    fecha_inicio, fecha_fin = None, None
+    if cubo_adhesiones.fecha_min is not None:
         st.sidebar.header("Filtros de Fechas")
-        fecha_min, fecha_max = df_inscripciones['FEC_INSCRIPCION'].min().date(), df_inscripciones['FEC_INSCRIPCION'].max().date()
+        fecha_min, fecha_max = cubo_adhesiones.fecha_min, cubo_adhesiones.fecha_max
         fecha_inicio = st.sidebar.date_input("Fecha de Inicio", value=fecha_min, min_value=fecha_min, max_value=fecha_max)
         fecha_fin = st.sidebar.date_input("Fecha de Fin", value=fecha_max, min_value=fecha_min, max_value=fecha_max)
-        df_inscripciones = df_inscripciones[(df_inscripciones['FEC_INSCRIPCION'].dt.date >= fecha_inicio) & 
-                                            (df_inscripciones['FEC_INSCRIPCION'].dt.date <= fecha_fin)]
-    
-    if df_inscripciones.empty:
+
+    # Métricas principales en una sola pasada por cubo
+    metricas = snapshot_artifact(
+        "metricas_inscripciones", [df_inscripciones, df_inscriptos],
+        lambda: headline_metrics(cubo_adhesiones, cubo_inscriptos, fecha_inicio, fecha_fin),
+        hoy, fecha_inicio, fecha_fin,
+    )
+    total_inscripciones = metricas['adhesiones']
+    if total_inscripciones == 0:
         st.write("No hay inscripciones para mostrar en el rango de fechas seleccionado.")
         return
-    
-    # Calcular edades en inscripciones
-    fecha_actual = pd.Timestamp(datetime.now())
-    df_inscripciones['Edad'] = (fecha_actual - pd.to_datetime(df_inscripciones['FEC_NACIMIENTO'])).dt.days // 365
-
-    # Calcular edades en inscriptos
-    df_inscriptos['Edad'] = (fecha_actual - df_inscriptos['FER_NAC']).dt.days // 365
 
     # Métricas de adhesiones
-    count_26_or_less = df_inscripciones[df_inscripciones['Edad'] <= 26]['CUIL'].nunique()
-    count_26_44 = df_inscripciones[(df_inscripciones['Edad'] > 26) & (df_inscripciones['Edad'] < 45)]['CUIL'].nunique()
-    count_45 = df_inscripciones[df_inscripciones['Edad'] >= 45]['CUIL'].nunique()
-
-    # Calcular personas de 45 o más años en inscriptos
-    count_45_inscriptos = df_inscriptos[df_inscriptos['Edad'] >= 45].shape[0]
+    count_26_or_less = metricas['cuil_26_o_menos']
+    count_26_44 = metricas['cuil_27_44']
+    count_45 = metricas['cuil_45_o_mas']
 
+    # Inscriptos (ID_EST_FIC = 8) de 45 o más años y de zonas favorecidas menores de 45
+    total_inscriptos = metricas['inscriptos']
+    count_45_inscriptos = metricas['inscriptos_45_o_mas']
+    total_dept_specific = metricas['zonas_favorecidas']
 
     # Calcular el número de CUIL únicos
-    unique_cuil_count = df_inscriptos['CUIL'].nunique()
-    unique_cuil_cuit = df_empresas_seleccionadas['CUIL'].nunique()
-
-
-    # Filtrar inscripciones para los departamentos específicos y que tengan menos de 45 años
-    df_dept_specific = df_inscriptos[
-        (df_inscriptos['N_DEPARTAMENTO'].isin([
-            'PRESIDENTE ROQUE SAENZ PEÑA', 
-            'GENERAL ROCA',
-            "RIO SECO",
-            "TULUMBA",
-            "POCHO",
-            "SAN JAVIER",
-            "SAN ALBERTO",
-            "MINAS",
-            "CRUZ DEL EJE",
-            "TOTORAL",
-            "SOBREMONTE",
-            "ISCHILIN"
-        ])) & (df_inscriptos['Edad'] < 45)
-    ]
-
-    total_dept_specific = df_dept_specific.shape[0]
-
-    # Cálculo total
-    total_inscripciones = df_inscripciones.shape[0]
-    total_inscriptos = df_inscriptos.shape[0]
-    total_cti = df_cti['CUIL'].nunique()
+    unique_cuil_count = metricas['match_unicos']
+    unique_cuil_cuit = len(key_index(df_empresas_seleccionadas, 'CUIL'))
+    # CTI: ID_EST_FIC = 12
+    total_cti = metricas['cti']
     # Mostrar las métricas en columnas
     col1, col3, col4, col5, col6, col7 = st.columns(6)
     with col1:
@@ -136,7 +131,7 @@ def show_inscriptions(df_inscripciones, df_inscriptos, df_empresas_seleccionadas
     col1, col2, col3, col4, col5 = st.columns(5)
 
     with col1:
-        st.metric(label="Inscriptos/Match", value=df_inscriptos.shape[0])
+        st.metric(label="Inscriptos/Match", value=total_inscriptos)
     with col2:
         st.metric(label="Personas Únicas inscriptas (CUIL)", value=unique_cuil_count)
     with col3:
@@ -146,62 +141,100 @@ def show_inscriptions(df_inscripciones, df_inscriptos, df_empresas_seleccionadas
     with col5:
         st.altair_chart(pie_chart, use_container_width=True)
 
+    # Embudo del ciclo de vida de las fichas (estados del README)
+    estados = ficha_states(df_inscriptos)
+    embudo = estados.funnel(adheridos=cubo_adhesiones.conteo())
+    embudo = embudo[embudo['Alcanzados'] > 0]
+    if not embudo.empty:
+        st.markdown("### Estado de las Fichas")
+        embudo_chart = alt.Chart(embudo).mark_bar().encode(
+            y=alt.Y('Estado:N', title='Estado', sort=embudo['Estado'].tolist()),
+            x=alt.X('Alcanzados:Q', title='Fichas que alcanzaron el estado'),
+            tooltip=['Estado', 'Fichas', 'Alcanzados']
+        ).properties(width=600, height=400)
+        st.altair_chart(embudo_chart, use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.dataframe(estados.resumen, hide_index=True)
+        with col2:
+            conversiones = estados.conversions(adheridos=cubo_adhesiones.conteo())
+            st.dataframe(conversiones, hide_index=True, column_config={'Tasa': st.column_config.NumberColumn(format="%.2f")})
+
+        # Cruces entre extractos resueltos con el índice de CUIL
+        match_cuiles, match_sin_adhesion = match_without_adhesion(df_inscripciones, df_inscriptos)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric(label="CUIL con más de una ficha (posibles DUPLICADO)", value=len(duplicate_fichas(df_inscriptos)))
+        with col2:
+            st.metric(label="Match sin adhesión registrada", value=match_sin_adhesion, help=f"De {match_cuiles} CUIL con match")
+
 
 
     # Verifica que las columnas de fecha estén presentes en los DataFrames
     if 'FEC_INSCRIPCION' in df_inscripciones.columns and 'FEC_SIST' in df_inscriptos.columns:
-        # Agrupar por fecha y contar inscripciones para el primer conjunto (Inscripciones)
-        inscripciones_por_fecha = df_inscripciones.groupby(df_inscripciones['FEC_INSCRIPCION'].dt.date).size().reset_index(name='Conteo')
-        inscripciones_por_fecha.columns = ['Fecha', 'Conteo']
-        inscripciones_por_fecha['Tipo'] = 'Adhesiones'
-    
-        # Agrupar por fecha y contar inscripciones para el segundo conjunto (Match)
-        match_por_fecha = df_inscriptos.groupby(df_inscriptos['FEC_SIST'].dt.date).size().reset_index(name='Conteo')
-        match_por_fecha.columns = ['Fecha', 'Conteo']
-        match_por_fecha['Tipo'] = 'Match'
-
-        # Agrupar por fecha y contar inscripciones para el segundo conjunto (Match)
-        cti_por_fecha = df_cti.groupby(df_cti['FEC_SIST'].dt.date).size().reset_index(name='Conteo')
-        cti_por_fecha.columns = ['Fecha', 'Conteo']
-        cti_por_fecha['Tipo'] = 'cti'
-    
-        # Combinar ambos DataFrames en uno solo
-        datos_combinados = pd.concat([inscripciones_por_fecha, match_por_fecha, cti_por_fecha])
-    
+        def series_por_fecha():
+            # Conteo por fecha para el primer conjunto (Inscripciones)
+            inscripciones_por_fecha = cubo_adhesiones.serie(fecha_inicio, fecha_fin)
+            inscripciones_por_fecha['Tipo'] = 'Adhesiones'
+
+            # Conteo por fecha para el segundo conjunto (Match)
+            match_por_fecha = cubo_inscriptos.serie(fecha_inicio, fecha_fin, ID_EST_FIC=8)
+            match_por_fecha['Tipo'] = 'Match'
+
+            # Conteo por fecha para el tercer conjunto (CTI)
+            cti_por_fecha = cubo_inscriptos.serie(fecha_inicio, fecha_fin, ID_EST_FIC=12)
+            cti_por_fecha['Tipo'] = 'cti'
+
+            # Combinar los tres conjuntos, agrupados por día, semana o mes según el rango
+            # elegido (o el de los datos, si no hay filtro de fechas)
+            datos_combinados = pd.concat([inscripciones_por_fecha, match_por_fecha, cti_por_fecha])
+            if datos_combinados.empty:
+                frecuencia = "D"
+            else:
+                frecuencia = time_bucket(
+                    fecha_inicio if fecha_inicio is not None else datos_combinados['Fecha'].min(),
+                    fecha_fin if fecha_fin is not None else datos_combinados['Fecha'].max(),
+                )
+            datos_combinados = bucket_series(datos_combinados, frecuencia, ['Tipo'])
+            unidad, formato = FRECUENCIAS[frecuencia]
+
+            fecha_chart_combined = alt.Chart(datos_combinados).mark_line().encode(
+                x=alt.X('Fecha:T', title='Fecha', axis=alt.Axis(format=formato, tickCount=unidad, labelAngle=-45)),
+                y=alt.Y('Conteo:Q', title='Cantidad'),
+                color='Tipo:N',  # Diferenciar por tipo (Inscripciones o Match)
+                tooltip=['Fecha:T', 'Conteo:Q', 'Tipo:N']
+            ).properties(width=800, height=400)
+
+            # Calcular la suma acumulada de Conteo para cada tipo
+            datos_combinados['Conteo Acumulado'] = datos_combinados.groupby('Tipo')['Conteo'].cumsum()
+
+            fecha_chart_acumulado = alt.Chart(datos_combinados).mark_line().encode(
+                x=alt.X('Fecha:T', title='Fecha', axis=alt.Axis(format=formato, tickCount=unidad, labelAngle=-45)),
+                y=alt.Y('Conteo Acumulado:Q', title='Cantidad Acumulada'),
+                color='Tipo:N',  # Diferenciar por tipo (Inscripciones, Match, cti)
+                tooltip=['Fecha:T', 'Conteo Acumulado:Q', 'Tipo:N']
+            ).properties(width=800, height=400)
+            return {'diario': fecha_chart_combined, 'acumulado': fecha_chart_acumulado}
+
+        graficos_fecha = cached_spec("series_fechas", [df_inscripciones, df_inscriptos], series_por_fecha, hoy, fecha_inicio, fecha_fin)
+
         # Crear gráfico combinado
         st.subheader("Postulaciones y Match por Fecha")
-        fecha_chart_combined = alt.Chart(datos_combinados).mark_line().encode(
-            x=alt.X('Fecha:T', title='Fecha', axis=alt.Axis(format='%d/%m/%Y', tickCount='day', labelAngle=-45)),
-            y=alt.Y('Conteo:Q', title='Cantidad'),
-            color='Tipo:N',  # Diferenciar por tipo (Inscripciones o Match)
-            tooltip=['Fecha:T', 'Conteo:Q', 'Tipo:N']
-        ).properties(width=800, height=400)
-
-        st.altair_chart(fecha_chart_combined, use_container_width=True)
-
-
-        # Calcular la suma acumulada de Conteo para cada tipo
-        datos_combinados['Conteo Acumulado'] = datos_combinados.groupby('Tipo')['Conteo'].cumsum()
+        show_spec(graficos_fecha['diario'])
 
         # Crear gráfico acumulado
         st.subheader("Conteo Acumulado por Fecha")
-        fecha_chart_acumulado = alt.Chart(datos_combinados).mark_line().encode(
-            x=alt.X('Fecha:T', title='Fecha', axis=alt.Axis(format='%d/%m/%Y', tickCount='day', labelAngle=-45)),
-            y=alt.Y('Conteo Acumulado:Q', title='Cantidad Acumulada'),
-            color='Tipo:N',  # Diferenciar por tipo (Inscripciones, Match, cti)
-            tooltip=['Fecha:T', 'Conteo Acumulado:Q', 'Tipo:N']
-        ).properties(width=800, height=400)
-    
-        # Mostrar el gráfico en Streamlit
-        st.altair_chart(fecha_chart_acumulado, use_container_width=True)
+        show_spec(graficos_fecha['acumulado'])
 
     
         # DNI por Localidad (Barras)
         if 'N_LOCALIDAD' in df_inscripciones.columns and 'N_DEPARTAMENTO' in df_inscripciones.columns:
-            dni_por_localidad = df_inscripciones.groupby(['N_LOCALIDAD', 'N_DEPARTAMENTO']).size().reset_index(name='Conteo')
+            dni_por_localidad = cubo_adhesiones.agrupar(['N_LOCALIDAD', 'N_DEPARTAMENTO'], fecha_inicio, fecha_fin)
             dni_por_localidad['N_DEPARTAMENTO'] = dni_por_localidad['N_DEPARTAMENTO'].apply(lambda x: 'INTERIOR' if x != 'CAPITAL' else 'CAPITAL')
     
-            dni_por_localidad_filter = st.multiselect("Filtrar por Región", dni_por_localidad['N_DEPARTAMENTO'].unique(), default=dni_por_localidad['N_DEPARTAMENTO'].unique())
+            regiones = dni_por_localidad['N_DEPARTAMENTO'].unique().tolist()
+            dni_por_localidad_filter = st.multiselect("Filtrar por Región", regiones, default=regiones)
             dni_por_localidad = dni_por_localidad[dni_por_localidad['N_DEPARTAMENTO'].isin(dni_por_localidad_filter)]
     
             top_10_localidades = dni_por_localidad.sort_values(by='Conteo', ascending=False).head(10)
@@ -219,27 +252,31 @@ def show_inscriptions(df_inscripciones, df_inscriptos, df_empresas_seleccionadas
 
     st.markdown("### por Departamentos")
     if 'N_DEPARTAMENTO' in df_inscripciones.columns:
-        departamentos = df_inscripciones['N_DEPARTAMENTO'].unique()
+        departamentos = cubo_adhesiones.agrupar(['N_DEPARTAMENTO'], fecha_inicio, fecha_fin)['N_DEPARTAMENTO'].tolist()
         selected_departamento = st.multiselect("Filtrar por Departamento", departamentos, default=departamentos)
-        df_filtered_departamentos = df_inscripciones[df_inscripciones['N_DEPARTAMENTO'].isin(selected_departamento)]
+        departamento_counts = cubo_adhesiones.agrupar(['N_DEPARTAMENTO', 'N_LOCALIDAD'], fecha_inicio, fecha_fin, N_DEPARTAMENTO=selected_departamento)
     else:
-        df_filtered_departamentos = df_inscripciones
-
-    departamento_counts = df_filtered_departamentos.groupby(['N_DEPARTAMENTO', 'N_LOCALIDAD']).size().reset_index(name='Cuenta')
+        departamento_counts = cubo_adhesiones.agrupar(['N_LOCALIDAD'], fecha_inicio, fecha_fin)
+    departamento_counts = departamento_counts.rename(columns={'Conteo': 'Cuenta'})
     departamento_counts_sorted = departamento_counts.sort_values(by='Cuenta', ascending=False)
 
     col1, col2 = st.columns([2, 3])
     with col2:
         st.subheader("Conteo por Departamento")
-        st.altair_chart(
-            alt.Chart(departamento_counts_sorted).mark_bar().encode(
-                y=alt.Y('N_DEPARTAMENTO:N', title='Departamento', sort='-x'),
-                x=alt.X('Cuenta:Q', title='Conteo'),
-                color=alt.Color('N_DEPARTAMENTO:N', legend=None),
-                tooltip=['N_DEPARTAMENTO', 'Cuenta']
-            ).properties(width=900, height=500),
-            use_container_width=True
-        )
+        if 'N_DEPARTAMENTO' in departamento_counts_sorted.columns:
+            # Una barra por departamento (los de menor conteo se agrupan en OTROS)
+            # en lugar de una fila por localidad
+            grafico_departamentos = cached_spec(
+                "departamentos", [df_inscripciones],
+                lambda: alt.Chart(top_categories(departamento_counts_sorted, 'N_DEPARTAMENTO', 'Cuenta')).mark_bar().encode(
+                    y=alt.Y('N_DEPARTAMENTO:N', title='Departamento', sort='-x'),
+                    x=alt.X('Cuenta:Q', title='Conteo'),
+                    color=alt.Color('N_DEPARTAMENTO:N', legend=None),
+                    tooltip=['N_DEPARTAMENTO', 'Cuenta']
+                ).properties(width=900, height=500),
+                fecha_inicio, fecha_fin, tuple(selected_departamento),
+            )
+            show_spec(grafico_departamentos)
     with col1:
         st.subheader("Tabla de Adhesiones")
         st.dataframe(departamento_counts_sorted, hide_index=True)
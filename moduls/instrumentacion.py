@@ -0,0 +1,113 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Mediciones de tiempo y memoria por etapa. Cada medición se guarda en memoria (las
+# últimas MAX_MEDICIONES, para el panel) y se emite como una línea JSON en el log
+# "moduls.instrumentacion".
+logger = logging.getLogger(__name__)
+
+MAX_MEDICIONES = 500
+
+_mediciones = deque(maxlen=MAX_MEDICIONES)
+_lock = threading.Lock()
+# Etapas abiertas en cada hilo, para registrar de qué etapa forma parte cada medición
+_local = threading.local()
+
+
+def frame_stats(valores):
+    # Filas y memoria (sin contar el contenido de los objetos de Python) de los
+    # DataFrames entre `valores`, incluidos los que vienen en listas o tuplas
+    filas, memoria = 0, 0
+    for valor in valores:
+        if isinstance(valor, (list, tuple)):
+            sub_filas, sub_memoria = frame_stats(valor)
+            filas, memoria = filas + sub_filas, memoria + sub_memoria
+        elif isinstance(valor, pd.DataFrame):
+            filas += len(valor)
+            memoria += int(valor.memory_usage(index=True, deep=False).sum())
+    return filas, memoria
+
+
+@contextmanager
+def measure(etapa, **datos):
+    pila = getattr(_local, "pila", None)
+    if pila is None:
+        pila = _local.pila = []
+    medicion = {
+        "etapa": etapa,
+        "padre": pila[-1] if pila else None,
+        "hilo": threading.current_thread().name,
+        "momento": datetime.now(timezone.utc).isoformat(),
+        **datos,
+    }
+    pila.append(etapa)
+    inicio = time.perf_counter()
+    try:
+        yield medicion
+    except Exception as e:
+        medicion["error"] = type(e).__name__
+        raise
+    finally:
+        pila.pop()
+        medicion["segundos"] = round(time.perf_counter() - inicio, 6)
+        with _lock:
+            _mediciones.append(medicion)
+        logger.info(json.dumps(medicion, default=str, ensure_ascii=False))
+
+
+def instrumented(etapa=None):
+    # Decorador: mide la función y registra filas y memoria de los DataFrames que
+    # recibe y de los que devuelve
+    def decorador(funcion):
+        nombre = etapa or funcion.__name__
+
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            filas, memoria = frame_stats(list(args) + list(kwargs.values()))
+            datos = {"filas": filas, "memoria": memoria} if filas else {}
+            with measure(nombre, **datos) as medicion:
+                resultado = funcion(*args, **kwargs)
+                filas, memoria = frame_stats([resultado])
+                if filas:
+                    medicion.update(filas_resultado=filas, memoria_resultado=memoria)
+                return resultado
+        return envoltura
+    return decorador
+
+
+def recent_measurements():
+    with _lock:
+        return list(_mediciones)
+
+
+def measurement_summary(mediciones=None):
+    # Cantidad y percentiles de tiempo por etapa
+    df = pd.DataFrame(mediciones if mediciones is not None else recent_measurements())
+    if df.empty:
+        return df
+    resumen = df.groupby("etapa")["segundos"].agg(
+        veces="count",
+        p50=lambda s: np.percentile(s, 50),
+        p95=lambda s: np.percentile(s, 95),
+        maximo="max",
+    )
+    return resumen.sort_values("p95", ascending=False).reset_index()
+
+
+def show_profiling_panel():
+    mediciones = recent_measurements()
+    with st.expander("Rendimiento"):
+        if not mediciones:
+            st.write("Sin mediciones todavía.")
+            return
+        st.dataframe(measurement_summary(mediciones), hide_index=True)
+        st.dataframe(pd.DataFrame(mediciones[::-1]), hide_index=True)
@@ -0,0 +1,73 @@
+import logging
+import threading
+from google.cloud import storage
+from moduls.carga import CACHE_DIR, METADATA_TTL, fetch_snapshots, load_data_from_disk
+
+logger = logging.getLogger(__name__)
+
+
+class Refrescador(threading.Thread):
+    # Revisa el bucket cada `intervalo` segundos y prepara las versiones nuevas fuera
+    # del hilo de las páginas. El juego completo de DataFrames se reemplaza de una
+    # sola vez, así cada render ve siempre una versión entera y ya cargada.
+
+    def __init__(self, blob_names, bucket_name, credentials, intervalo=METADATA_TTL, storage_client=None, cache_dir=CACHE_DIR):
+        super().__init__(name="refrescador-datos", daemon=True)
+        self.blob_names = list(blob_names)
+        self.bucket_name = bucket_name
+        self.credentials = credentials
+        self.intervalo = intervalo
+        self.storage_client = storage_client
+        self.cache_dir = cache_dir
+        self._actual = None
+        self._lista = threading.Event()
+        # Se marca al terminar cada intento de actualización, haya funcionado o no
+        self._intentado = threading.Event()
+        self._detener = threading.Event()
+        self.ultimo_error = None
+
+        # Al arrancar se sirve lo último que quedó en disco, si existe
+        try:
+            self._publicar(load_data_from_disk(self.blob_names, self.bucket_name, self.cache_dir))
+        except Exception:
+            logger.exception("No se pudo leer la copia local de los datos")
+
+    def _publicar(self, snapshot):
+        if snapshot is not None:
+            self._actual = snapshot
+            self._lista.set()
+
+    def refresh(self):
+        if self.storage_client is None:
+            self.storage_client = storage.Client(credentials=self.credentials)
+        bucket = self.storage_client.bucket(self.bucket_name)
+        self._publicar(fetch_snapshots(bucket, self.bucket_name, self.blob_names, self.cache_dir))
+
+    def run(self):
+        while not self._detener.is_set():
+            try:
+                self.refresh()
+                self.ultimo_error = None
+            except Exception as e:
+                # Se sigue sirviendo la última versión buena
+                logger.exception("Falló la actualización de los datos del bucket %s", self.bucket_name)
+                self.ultimo_error = e
+            finally:
+                self._intentado.set()
+            self._detener.wait(self.intervalo)
+
+    def stop(self):
+        self._detener.set()
+
+    def current(self, timeout=None):
+        # Última versión completa (dfs, file_dates). Si todavía no hay ninguna espera
+        # hasta `timeout` segundos o hasta que falle el primer intento, y devuelve None.
+        if not self._lista.is_set():
+            self._intentado.wait(timeout)
+        if not self._lista.is_set():
+            return None
+        dfs, file_dates = self._actual
+        return [df.copy(deep=False) for df in dfs], list(file_dates)
+
+    def is_ready(self):
+        return self._lista.is_set()
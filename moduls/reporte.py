@@ -0,0 +1,266 @@
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+from moduls import carga
+from moduls.agregados import adhesiones_cube, inscriptos_cube, headline_metrics
+from moduls.almacenamiento_local import LocalStorageClient
+from moduls.empresas import quota_engine
+from moduls.fichas import ficha_states, state_name
+from moduls.indices import key_index, duplicate_fichas, match_without_adhesion
+from moduls.inscripciones import parse_dates
+from moduls.respuestas import survey_scores
+
+# Reporte del tablero sin Streamlit: las mismas métricas de Inscripciones, Empresas y
+# Respuestas escritas a Excel o Parquet. Las tablas de detalle se escriben por
+# bloques, sin armar el archivo completo en memoria.
+# Uso: python -m moduls.reporte --destino salida [--formato parquet] [--por-departamento]
+
+FILAS_POR_BLOQUE = 50_000
+# Filas de datos por hoja de Excel (el límite es 1.048.576 contando la cabecera)
+MAX_FILAS_EXCEL = 1_048_575
+
+
+class EscritorExcel:
+    # Libro en modo write_only: cada fila se escribe al archivo temporal de la hoja
+    # apenas se agrega
+    extension = ".xlsx"
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.libro = Workbook(write_only=True)
+
+    def _nueva_hoja(self, nombre, parte, columnas):
+        # Excel admite hasta 31 caracteres en el nombre de la hoja
+        sufijo = "" if parte == 1 else f" ({parte})"
+        hoja = self.libro.create_sheet(title=nombre[:31 - len(sufijo)] + sufijo)
+        hoja.append(columnas)
+        return hoja
+
+    def write(self, nombre, df):
+        columnas = [str(col) for col in df.columns]
+        parte = 1
+        hoja = self._nueva_hoja(nombre, parte, columnas)
+        filas_hoja = 0
+        for inicio in range(0, len(df), FILAS_POR_BLOQUE):
+            bloque = df.iloc[inicio:inicio + FILAS_POR_BLOQUE]
+            # Los vacíos (NaN, NaT, NA) quedan como celdas vacías
+            bloque = bloque.astype(object).where(bloque.notna(), None)
+            for fila in bloque.itertuples(index=False, name=None):
+                if filas_hoja == MAX_FILAS_EXCEL:
+                    parte += 1
+                    hoja = self._nueva_hoja(nombre, parte, columnas)
+                    filas_hoja = 0
+                hoja.append(fila)
+                filas_hoja += 1
+
+    def close(self):
+        self.libro.save(self.ruta)
+
+
+class EscritorParquet:
+    # Un archivo Parquet por tabla dentro de la carpeta `ruta`
+    extension = ""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        os.makedirs(ruta, exist_ok=True)
+
+    def write(self, nombre, df):
+        archivo = os.path.join(self.ruta, slug(nombre) + ".parquet")
+        # El esquema sale del primer bloque; los siguientes se convierten a ese esquema
+        schema = pa.Table.from_pandas(df.iloc[:FILAS_POR_BLOQUE], preserve_index=False).schema
+        with pq.ParquetWriter(archivo, schema) as writer:
+            for inicio in range(0, max(len(df), 1), FILAS_POR_BLOQUE):
+                bloque = df.iloc[inicio:inicio + FILAS_POR_BLOQUE]
+                writer.write_table(pa.Table.from_pandas(bloque, schema=schema, preserve_index=False))
+
+    def close(self):
+        pass
+
+
+ESCRITORES = {"xlsx": EscritorExcel, "parquet": EscritorParquet}
+
+
+def slug(texto):
+    return re.sub(r"[^0-9A-Za-z]+", "_", str(texto)).strip("_").lower() or "sin_nombre"
+
+
+def report_tables(dfs, hoy, inicio=None, fin=None, respuestas=True, detalle=True):
+    # Tablas del reporte, en orden, como pares (nombre, DataFrame). Se generan a
+    # medida que se escriben.
+    df_inscripciones, df_empresas, df_inscriptos, df_empresas_seleccionadas, df_respuestas = dfs
+    df_inscripciones, df_inscriptos = parse_dates(df_inscripciones, df_inscriptos)
+    cubo_adhesiones = adhesiones_cube(df_inscripciones, hoy)
+    cubo_inscriptos = inscriptos_cube(df_inscriptos, hoy)
+    metricas = headline_metrics(cubo_adhesiones, cubo_inscriptos, inicio, fin)
+    tabla_cupos, fuera_cupo = quota_engine(df_empresas, df_inscriptos)
+    estados = ficha_states(df_inscriptos)
+    match_cuiles, match_sin_adhesion = match_without_adhesion(df_inscripciones, df_inscriptos)
+
+    # Mismas cifras que las métricas de las pestañas
+    yield "Resumen", pd.DataFrame([
+        ("Adhesiones/postulantes", metricas['adhesiones'] - metricas['cuil_26_o_menos']),
+        ("Entre 26 y 44 años", metricas['cuil_27_44']),
+        ("45 años o más", metricas['cuil_45_o_mas']),
+        ("Personas con CUIT", len(key_index(df_empresas_seleccionadas, 'CUIL'))),
+        ("CTI", metricas['cti']),
+        ("Inscriptos/Match", metricas['inscriptos']),
+        ("Personas Únicas inscriptas (CUIL)", metricas['match_unicos']),
+        ("Inscriptos 45 años o más", metricas['inscriptos_45_o_mas']),
+        ("Inscriptos Zonas Favorecidas", metricas['zonas_favorecidas']),
+        ("CUIL con más de una ficha (posibles DUPLICADO)", len(duplicate_fichas(df_inscriptos))),
+        ("Match sin adhesión registrada", match_sin_adhesion),
+        ("CUIL con match", match_cuiles),
+        ("Empresas Adheridas", len(key_index(df_empresas, 'CUIT'))),
+        ("Empresas con cupo completo", int((tabla_cupos['CUPO_RESTANTE'] <= 0).sum())),
+        ("Fichas fuera de cupo (candidatas)", len(fuera_cupo)),
+    ], columns=['Métrica', 'Valor'])
+
+    yield "Estados", estados.resumen
+    yield "Embudo", estados.funnel(adheridos=cubo_adhesiones.conteo())
+    yield "Conversiones", estados.conversions(adheridos=cubo_adhesiones.conteo())
+
+    columnas = [col for col in ['N_DEPARTAMENTO', 'N_LOCALIDAD'] if col in df_inscripciones.columns]
+    if columnas:
+        yield "Adhesiones por localidad", (
+            cubo_adhesiones.agrupar(columnas, inicio, fin)
+            .rename(columns={'Conteo': 'Cuenta'})
+            .sort_values('Cuenta', ascending=False, ignore_index=True)
+        )
+    yield "Adhesiones por fecha", cubo_adhesiones.serie(inicio, fin)
+    yield "Empresas", tabla_cupos.rename(columns={'INSCRIPTOS': 'Inscriptos', 'CUPO_RESTANTE': 'Cupo restante'})
+    if respuestas and 'ID_INSCRIPCION' in df_respuestas.columns:
+        yield "Respuestas", survey_scores(df_respuestas).averages()
+
+    if detalle:
+        yield "Fichas", df_inscriptos.assign(ESTADO=estados_de(df_inscriptos))
+        yield "Fichas fuera de cupo", df_inscriptos.iloc[fuera_cupo]
+
+
+def estados_de(df_inscriptos):
+    # Nombre del estado de cada ficha
+    codigos = df_inscriptos['ID_EST_FIC']
+    nombres = {codigo: state_name(codigo) for codigo in codigos.dropna().unique()}
+    return codigos.map(nombres)
+
+
+def write_report(dfs, ruta, formato="xlsx", hoy=None, **opciones):
+    escritor = ESCRITORES[formato](ruta)
+    try:
+        for nombre, df in report_tables(dfs, hoy or date.today(), **opciones):
+            escritor.write(nombre, df)
+    finally:
+        escritor.close()
+    return ruta
+
+
+def subset(df, mascara, etiqueta):
+    # Filas de `df` según `mascara`, con una versión propia para la caché de artefactos
+    parte = df.loc[np.asarray(mascara, dtype=bool)].reset_index(drop=True)
+    parte.attrs = {"blob": df.attrs.get("blob"), "clave": (df.attrs.get("clave"), etiqueta)}
+    return parte
+
+
+def department_frames(dfs, departamento):
+    # Extractos de un departamento: adhesiones y fichas del departamento, las empresas
+    # de esas fichas (por CUIT) y las selecciones de empresa de esas personas (por CUIL)
+    df_inscripciones, df_empresas, df_inscriptos, df_empresas_seleccionadas, df_respuestas = dfs
+    inscripciones = subset(df_inscripciones, df_inscripciones['N_DEPARTAMENTO'] == departamento, departamento)
+    inscriptos = subset(df_inscriptos, df_inscriptos['N_DEPARTAMENTO'] == departamento, departamento)
+    empresas = subset(df_empresas, key_index(inscriptos, 'CUIT').contiene(df_empresas['CUIT']), departamento)
+    seleccionadas = subset(df_empresas_seleccionadas, key_index(inscripciones, 'CUIL').contiene(df_empresas_seleccionadas['CUIL']), departamento)
+    return [inscripciones, empresas, inscriptos, seleccionadas, df_respuestas]
+
+
+# Extractos de cada proceso del reporte por departamento, leídos una sola vez de la
+# copia local
+_datos = None
+
+
+def _init_worker(bucket_name, cache_dir):
+    global _datos
+    cargados = carga.load_data_from_disk(carga.BLOB_NAMES, bucket_name, cache_dir)
+    if cargados is None:
+        raise RuntimeError(f"No hay copia local de los datos en {cache_dir}")
+    _datos = cargados[0]
+
+
+def report_paths(departamentos, destino, formato):
+    # Ruta del reporte de cada departamento; si dos nombres dan el mismo archivo (por
+    # ejemplo, con espacios de más) se numeran
+    rutas, usados = {}, set()
+    for departamento in departamentos:
+        base = f"reporte_{slug(departamento)}"
+        nombre, numero = base, 1
+        while nombre in usados:
+            numero += 1
+            nombre = f"{base}_{numero}"
+        usados.add(nombre)
+        rutas[departamento] = os.path.join(destino, nombre + ESCRITORES[formato].extension)
+    return rutas
+
+
+def _department_report(departamento, ruta, formato, hoy, opciones):
+    # Las respuestas no tienen departamento: van solo en el reporte general
+    return write_report(department_frames(_datos, departamento), ruta, formato, hoy, respuestas=False, **opciones)
+
+
+def department_reports(departamentos, destino, formato="xlsx", hoy=None, procesos=None,
+                       bucket_name=carga.BUCKET, cache_dir=carga.CACHE_DIR, **opciones):
+    # Un reporte por departamento, en paralelo. Cada proceso lee los extractos de la
+    # copia local, así no se envían los DataFrames entre procesos.
+    hoy = hoy or date.today()
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_init_worker, initargs=(bucket_name, cache_dir)) as executor:
+        futuros = [executor.submit(_department_report, departamento, ruta, formato, hoy, opciones)
+                   for departamento, ruta in report_paths(departamentos, destino, formato).items()]
+        return [futuro.result() for futuro in futuros]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reporte de Empleo +26 sin Streamlit")
+    parser.add_argument("--destino", required=True, help="Carpeta donde se escriben los reportes")
+    parser.add_argument("--formato", choices=sorted(ESCRITORES), default="xlsx")
+    parser.add_argument("--credenciales", help="JSON de la cuenta de servicio para leer el bucket")
+    parser.add_argument("--local", help="Carpeta con los extractos en lugar del bucket (un subdirectorio por bucket)")
+    parser.add_argument("--cache-dir", default=carga.CACHE_DIR)
+    parser.add_argument("--desde", type=date.fromisoformat)
+    parser.add_argument("--hasta", type=date.fromisoformat)
+    parser.add_argument("--sin-detalle", action="store_true", help="Omitir las tablas de fichas")
+    parser.add_argument("--por-departamento", action="store_true", help="Además, un reporte por departamento")
+    parser.add_argument("--procesos", type=int, help="Procesos para los reportes por departamento")
+    args = parser.parse_args()
+
+    if args.local:
+        storage_client, credentials = LocalStorageClient(args.local), None
+    else:
+        from google.oauth2 import service_account
+        storage_client = None
+        credentials = service_account.Credentials.from_service_account_file(args.credenciales) if args.credenciales else None
+
+    # Deja actualizada la copia local, que luego leen los procesos por departamento
+    dfs, _ = carga.load_data_from_bucket(carga.BLOB_NAMES, carga.BUCKET, credentials, storage_client=storage_client, cache_dir=args.cache_dir)
+
+    os.makedirs(args.destino, exist_ok=True)
+    hoy = datetime.now().date()
+    opciones = {"inicio": args.desde, "fin": args.hasta, "detalle": not args.sin_detalle}
+    ruta = os.path.join(args.destino, "reporte" + ESCRITORES[args.formato].extension)
+    print(write_report(dfs, ruta, args.formato, hoy, **opciones))
+
+    if args.por_departamento:
+        departamentos = sorted(dfs[0]['N_DEPARTAMENTO'].dropna().unique().tolist())
+        for ruta in department_reports(departamentos, args.destino, args.formato, hoy, args.procesos,
+                                       cache_dir=args.cache_dir, **opciones):
+            print(ruta)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,98 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import altair as alt
+from moduls.cache import snapshot_artifact
+from moduls.instrumentacion import instrumented
 
+ASPECTOS = ["APRENDER", "DECISIONES", "INFORMACION", "EXPLICAR", "HERRAMIENTAS", "CALCULO", "INSTRUCCIONES"]
+BINS_HISTOGRAMA = 10
+SIN_CATEGORIA = "SIN CATEGORIA"
+
+
+class PuntajesEncuesta:
+    # Promedio de cada inscripción por aspecto y, por categoría, la suma y cantidad de
+    # esos promedios e histogramas. Cualquier combinación de categorías se responde
+    # sumando las filas de las categorías elegidas. Una inscripción con respuestas en
+    # varias categorías aporta un promedio por cada una. La última fila guarda los
+    # promedios por inscripción sobre todas las respuestas, sin separar por categoría,
+    # que es lo que se muestra sin filtro.
+
+    def __init__(self, df_respuestas):
+        if 'CATEGORIA' in df_respuestas.columns:
+            codigos, categorias = pd.factorize(df_respuestas['CATEGORIA'], sort=True)
+            self.categorias = [str(c) for c in categorias]
+        else:
+            codigos, self.categorias = np.full(len(df_respuestas), -1), []
+        if (codigos < 0).any():
+            codigos = np.where(codigos < 0, len(self.categorias), codigos)
+            self.categorias.append(SIN_CATEGORIA)
+
+        base = pd.DataFrame({'GRUPO': codigos, 'ID_INSCRIPCION': df_respuestas['ID_INSCRIPCION'].to_numpy()})
+        for aspecto in ASPECTOS:
+            base[aspecto] = pd.to_numeric(df_respuestas[aspecto], errors='coerce').to_numpy(dtype=float)
+        medias = base.groupby(['GRUPO', 'ID_INSCRIPCION'], sort=False)[ASPECTOS].mean()
+        medias_todas = base.groupby('ID_INSCRIPCION', sort=False)[ASPECTOS].mean()
+        self._todas = len(self.categorias)
+        grupo = np.concatenate([medias.index.get_level_values('GRUPO').to_numpy(), np.full(len(medias_todas), self._todas)])
+        valores = np.concatenate([medias.to_numpy(dtype=float), medias_todas.to_numpy(dtype=float)])
+
+        k = self._todas + 1
+        self.sumas = np.zeros((k, len(ASPECTOS)))
+        self.conteos = np.zeros((k, len(ASPECTOS)), dtype=np.int32)
+        self.histogramas = np.zeros((k, len(ASPECTOS), BINS_HISTOGRAMA), dtype=np.int32)
+        self.bordes = np.zeros((len(ASPECTOS), BINS_HISTOGRAMA + 1))
+        for j in range(len(ASPECTOS)):
+            validos = ~np.isnan(valores[:, j])
+            v, g = valores[validos, j], grupo[validos]
+            self.sumas[:, j] = np.bincount(g, weights=v, minlength=k)
+            self.conteos[:, j] = np.bincount(g, minlength=k)
+            minimo, maximo = (v.min(), v.max()) if len(v) else (0.0, 1.0)
+            self.bordes[j] = np.linspace(minimo, maximo if maximo > minimo else minimo + 1, BINS_HISTOGRAMA + 1)
+            tramo = np.clip(np.searchsorted(self.bordes[j], v, side='right') - 1, 0, BINS_HISTOGRAMA - 1)
+            self.histogramas[:, j] = np.bincount(g * BINS_HISTOGRAMA + tramo, minlength=k * BINS_HISTOGRAMA).reshape(k, BINS_HISTOGRAMA)
+
+    def _filas(self, seleccion):
+        if not seleccion:
+            return [self._todas]
+        return [self.categorias.index(c) for c in seleccion if c in self.categorias]
+
+    def averages(self, seleccion=None):
+        filas = self._filas(seleccion)
+        sumas = self.sumas[filas].sum(axis=0, dtype=np.float64)
+        conteos = self.conteos[filas].sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            promedios = np.where(conteos > 0, sumas / conteos, np.nan)
+        return pd.DataFrame({'Aspecto': ASPECTOS, 'Promedio': np.round(promedios, 2), 'Inscripciones': conteos})
+
+    def distribution(self, aspecto, seleccion=None):
+        j = ASPECTOS.index(aspecto)
+        cantidades = self.histogramas[self._filas(seleccion), j].sum(axis=0)
+        return pd.DataFrame({
+            'Desde': self.bordes[j][:-1].round(2),
+            'Hasta': self.bordes[j][1:].round(2),
+            'Cantidad': cantidades,
+        })
+
+
+def survey_scores(df_respuestas):
+    return snapshot_artifact("puntajes_encuesta", [df_respuestas], instrumented("puntajes_encuesta")(lambda: PuntajesEncuesta(df_respuestas)))
+
+
+@instrumented()
 def show_responses(df_respuestas, file_date_respuestas):
-    columnas_relevantes = ["APRENDER", "DECISIONES", "INFORMACION", "EXPLICAR", "HERRAMIENTAS", "CALCULO", "INSTRUCCIONES"]
+    columnas_relevantes = ASPECTOS
 
     if all(col in df_respuestas.columns for col in columnas_relevantes) and 'ID_INSCRIPCION' in df_respuestas.columns:
-        df_respuestas = df_respuestas[columnas_relevantes + ["ID_INSCRIPCION"]]
-
-        df_promedios = df_respuestas.groupby("ID_INSCRIPCION").mean().reset_index()
-        df_promedios_melted = df_promedios.drop("ID_INSCRIPCION", axis=1).mean().reset_index()
-        df_promedios_melted.columns = ['Aspecto', 'Promedio']
-        df_promedios_melted['Promedio'] = df_promedios_melted['Promedio'].round(2)
-
-        # Filtro por categoría si se desea (requiere una columna 'CATEGORIA' en df_respuestas)
-        categorias = df_respuestas['CATEGORIA'].unique() if 'CATEGORIA' in df_respuestas.columns else []
-        selected_categoria = st.selectbox("Seleccionar Categoría", categorias) if categorias else None
-        
-        if selected_categoria:
-            df_respuestas = df_respuestas[df_respuestas['CATEGORIA'] == selected_categoria]
-            
+        # Sumas y conteos por categoría calculados una vez por versión de los datos
+        puntajes = survey_scores(df_respuestas)
+
+        # Filtro por categoría (vacío = todas)
+        categorias = puntajes.categorias
+        selected_categorias = st.multiselect("Seleccionar Categoría", categorias) if categorias else []
+
+        df_promedios_melted = puntajes.averages(selected_categorias)
+
         st.subheader("Promedio por Aspecto")
         #total_respondieron = df_respuestas.shape[0]
         #st.metric(label="Respuestas", value=total_respondieron)
@@ -39,5 +112,17 @@ def show_responses(df_respuestas, file_date_respuestas):
 
         st.subheader("Promedios de Aspectos")
         st.dataframe(df_promedios_melted, hide_index=True)
+
+        # Distribución de los promedios por inscripción para un aspecto
+        st.subheader("Distribución por Aspecto")
+        aspecto = st.selectbox("Aspecto", ASPECTOS)
+        distribucion = puntajes.distribution(aspecto, selected_categorias)
+        histograma = alt.Chart(distribucion).mark_bar().encode(
+            x=alt.X('Desde:Q', bin='binned', title=aspecto),
+            x2='Hasta:Q',
+            y=alt.Y('Cantidad:Q', title='Inscripciones'),
+            tooltip=['Desde:Q', 'Hasta:Q', 'Cantidad:Q']
+        ).properties(width=800, height=300)
+        st.altair_chart(histograma, use_container_width=True)
     else:
         st.error("Faltan columnas necesarias en el DataFrame. Verifica el archivo CSV.")
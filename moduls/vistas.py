@@ -0,0 +1,37 @@
+import streamlit as st
+from moduls.inscripciones import show_inscriptions
+from moduls.empresas import show_companies
+from moduls.respuestas import show_responses
+
+# Vistas del tablero. Cada una declara qué extractos y qué fechas de actualización usa
+# (posiciones en carga.BLOB_NAMES) y la función que la muestra. Solo se ejecuta la vista
+# elegida; lo que calcula cada una se guarda con snapshot_artifact según la versión
+# de sus extractos y, para lo que depende de filtros, según los filtros.
+VISTAS = {
+    "Inscripciones": {
+        "mostrar": show_inscriptions,
+        "extractos": [0, 2, 3],
+        "fechas": [0, 2, 3],
+    },
+    "Empresas": {
+        "mostrar": show_companies,
+        "extractos": [1, 2],
+        "fechas": [1],
+    },
+    "Respuestas": {
+        "mostrar": show_responses,
+        "extractos": [4],
+        "fechas": [4],
+    },
+}
+
+
+def select_view():
+    # Selector en lugar de st.tabs: con pestañas Streamlit ejecuta las tres en cada rerun
+    return st.radio("Vista", list(VISTAS), horizontal=True, key="vista", label_visibility="collapsed")
+
+
+def render_view(nombre, dfs, file_dates):
+    vista = VISTAS[nombre]
+    argumentos = [dfs[i] for i in vista["extractos"]] + [file_dates[i] for i in vista["fechas"]]
+    return vista["mostrar"](*argumentos)
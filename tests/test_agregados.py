@@ -0,0 +1,96 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from benchmarks.bench_metricas import mask_metrics, synthetic_frames
+from moduls.agregados import CuboDiario, adhesiones_cube, headline_metrics, inscriptos_cube
+from moduls.cache import artefactos
+
+HOY = date.today()
+
+
+@pytest.fixture(autouse=True)
+def sin_artefactos():
+    artefactos.clear()
+    yield
+    artefactos.clear()
+
+
+def adhesiones(fechas, nacimientos, cuiles):
+    return pd.DataFrame({
+        "CUIL": cuiles,
+        "FEC_INSCRIPCION": pd.to_datetime(fechas),
+        "FEC_NACIMIENTO": pd.to_datetime(nacimientos),
+        "N_DEPARTAMENTO": "CAPITAL",
+    })
+
+
+def test_range_is_inclusive_and_open_ended():
+    df = adhesiones(pd.date_range("2024-01-01", periods=10), ["1990-01-01"] * 10, range(10))
+    cubo = CuboDiario(df, "FEC_INSCRIPCION", "FEC_NACIMIENTO", ["N_DEPARTAMENTO"], HOY)
+
+    assert cubo.conteo(date(2024, 1, 3), date(2024, 1, 5)) == 3
+    assert cubo.conteo(inicio=date(2024, 1, 8)) == 3
+    assert cubo.conteo(fin=date(2024, 1, 2)) == 2
+    assert cubo.conteo(date(2024, 2, 1), date(2024, 2, 5)) == 0
+    assert cubo.distintos(date(2024, 1, 3), date(2024, 1, 5)) == 3
+    serie = cubo.serie(date(2024, 1, 3), date(2024, 1, 5))
+    assert serie["Fecha"].tolist() == [date(2024, 1, 3), date(2024, 1, 4), date(2024, 1, 5)]
+    assert (cubo.fecha_min, cubo.fecha_max) == (date(2024, 1, 1), date(2024, 1, 10))
+
+
+def test_rows_without_dates():
+    df = adhesiones(["2024-01-02", None, "2024-01-03"], ["1990-01-01", "1990-01-01", None], [1, 2, 3])
+    cubo = CuboDiario(df, "FEC_INSCRIPCION", "FEC_NACIMIENTO", [], HOY)
+
+    # Sin fecha: cuenta en el total, no en un rango ni en la serie ni en fecha_min
+    assert cubo.conteo() == 3
+    assert cubo.conteo(date(2024, 1, 1), date(2024, 12, 31)) == 2
+    assert cubo.serie()["Conteo"].sum() == 2
+    assert cubo.fecha_min == date(2024, 1, 2)
+    # Sin nacimiento: banda -1
+    assert sorted(cubo.celdas["BANDA"].tolist()) == [-1, 1, 1]
+
+    # La pestaña descarta las adhesiones sin alguna de las dos fechas
+    assert adhesiones_cube(df, HOY).conteo() == 1
+
+
+def test_merge_matches_full_rebuild():
+    df_inscripciones, df_inscriptos = synthetic_frames(4000, semilla=3)
+    n, m = 3000, 1500
+    anterior = df_inscripciones.iloc[:n].copy()
+    anterior.attrs = {"blob": "adhesiones", "clave": "v1"}
+    anteriores_fichas = df_inscriptos.iloc[:m].copy()
+    anteriores_fichas.attrs = {"blob": "fichas", "clave": "v1"}
+    adhesiones_cube(anterior, HOY)
+    inscriptos_cube(anteriores_fichas, HOY)
+
+    # Versión nueva con filas agregadas al final, como la deja la carga incremental
+    nueva = df_inscripciones.copy()
+    nueva.attrs = {"blob": "adhesiones", "clave": "v2", "base": "v1", "filas_base": n}
+    nuevas_fichas = df_inscriptos.copy()
+    nuevas_fichas.attrs = {"blob": "fichas", "clave": "v2", "base": "v1", "filas_base": m}
+    unido = (adhesiones_cube(nueva, HOY), inscriptos_cube(nuevas_fichas, HOY))
+    artefactos.clear()
+    completo = (adhesiones_cube(df_inscripciones, HOY), inscriptos_cube(df_inscriptos, HOY))
+
+    for inicio, fin in [(None, None), (date(2024, 3, 1), date(2024, 5, 31))]:
+        assert headline_metrics(*unido, inicio, fin) == headline_metrics(*completo, inicio, fin)
+        assert unido[0].serie(inicio, fin).equals(completo[0].serie(inicio, fin))
+    columnas = ["N_DEPARTAMENTO", "N_LOCALIDAD"]
+    agrupado = lambda cubo: cubo.agrupar(columnas).sort_values(columnas, ignore_index=True)
+    assert agrupado(unido[0]).equals(agrupado(completo[0]))
+
+
+def test_distinct_counts_match_the_mask_path():
+    df_inscripciones, df_inscriptos = synthetic_frames(6000, semilla=5)
+    df_inscripciones.loc[::50, "FEC_INSCRIPCION"] = pd.NaT
+    df_inscripciones.loc[7::50, "FEC_NACIMIENTO"] = pd.NaT
+    df_inscriptos.loc[::40, "FER_NAC"] = pd.NaT
+    df_inscriptos.loc[3::40, "FEC_SIST"] = pd.NaT
+    cubos = adhesiones_cube(df_inscripciones, HOY), inscriptos_cube(df_inscriptos, HOY)
+
+    for inicio, fin in [(date(2024, 1, 1), date(2024, 12, 31)), (date(2024, 2, 10), date(2024, 2, 20))]:
+        esperado = {clave: int(valor) for clave, valor in mask_metrics(df_inscripciones, df_inscriptos, inicio, fin).items()}
+        assert headline_metrics(*cubos, inicio, fin) == esperado
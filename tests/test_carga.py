@@ -0,0 +1,147 @@
+import os
+
+import pandas as pd
+import pytest
+
+from moduls import carga
+from moduls.almacenamiento_local import LocalStorageClient
+
+BUCKET = carga.BUCKET
+BLOB = "vt_reportes_ppp_mas26.txt"
+
+
+def fichas(desde, n, estado=4):
+    return pd.DataFrame({
+        "CUIL": range(20_000_000_000 + desde, 20_000_000_000 + desde + n),
+        "CUIT": 30_000_000_000,
+        "ID_FICHA": range(desde, desde + n),
+        "ID_EST_FIC": estado,
+        "FER_NAC": "1980-01-01",
+        "FEC_SIST": "2024-06-01",
+        "N_DEPARTAMENTO": "CAPITAL",
+        "RAZON_SOCIAL": "EMPRESA 1",
+    })
+
+
+def touch(ruta):
+    # Nueva generación del blob aunque el cambio caiga en el mismo instante
+    stat = os.stat(ruta)
+    os.utime(ruta, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def entorno(tmp_path):
+    carga.snapshots.clear()
+    carga._versiones.clear()
+    os.makedirs(tmp_path / BUCKET)
+    archivo = tmp_path / BUCKET / BLOB
+    fichas(0, 1000).to_csv(archivo, index=False)
+    cliente = LocalStorageClient(str(tmp_path))
+    cache_dir = str(tmp_path / "cache")
+
+    def cargar():
+        # Sin el atajo de METADATA_TTL, como una consulta posterior al bucket
+        carga._versiones.clear()
+        dfs, _ = carga.load_data_from_bucket([BLOB], BUCKET, None, storage_client=cliente, cache_dir=cache_dir)
+        return dfs[0]
+
+    yield archivo, cargar
+    carga.snapshots.clear()
+    carga._versiones.clear()
+
+
+def test_append_is_incremental(entorno):
+    archivo, cargar = entorno
+    cargar()
+    fichas(1000, 50).to_csv(archivo, mode="a", header=False, index=False)
+    touch(archivo)
+
+    df = cargar()
+    assert df.attrs.get("base") is not None
+    assert len(df) == 1050
+    assert df["ID_FICHA"].tolist() == list(range(1050))
+
+    # La huella guardada cubre también lo agregado: un segundo agregado sigue siendo incremental
+    fichas(1050, 20).to_csv(archivo, mode="a", header=False, index=False)
+    touch(archivo)
+
+    df = cargar()
+    assert df.attrs.get("base") is not None
+    assert df["ID_FICHA"].tolist() == list(range(1070))
+
+
+def test_in_place_edit_plus_append_reloads_everything(entorno):
+    archivo, cargar = entorno
+    cargar()
+    # Una fila vieja cambia de estado (mismo largo en bytes) y se agregan filas al final
+    contenido = fichas(0, 1000)
+    contenido.loc[10, "ID_EST_FIC"] = 3
+    pd.concat([contenido, fichas(1000, 50)]).to_csv(archivo, index=False)
+    touch(archivo)
+
+    df = cargar()
+    assert df.attrs.get("base") is None
+    assert len(df) == 1050
+    assert df.loc[df["ID_FICHA"] == 10, "ID_EST_FIC"].item() == 3
+
+
+def test_chunks_share_date_format_and_dictionary_type(tmp_path, monkeypatch):
+    # Primer bloque sin departamento y con fechas que pandas podría leer como día/mes
+    monkeypatch.setattr(carga, "CHUNK_FILAS", 10)
+    df = fichas(0, 30)
+    df.loc[:9, "N_DEPARTAMENTO"] = None
+    df.loc[:9, "FEC_SIST"] = "2024-01-02"
+    df.loc[10:, "FEC_SIST"] = "2024-06-13 10:30:00"
+    archivo = tmp_path / BLOB
+    df.to_csv(archivo, index=False)
+    ruta = str(tmp_path / "parte.parquet")
+
+    with open(archivo, "rb") as stream:
+        filas, _ = carga.ingest_csv(stream, ruta, carga.ESQUEMAS[BLOB])
+
+    leido = pd.read_parquet(ruta)
+    assert filas == 30
+    assert leido["N_DEPARTAMENTO"].isna().sum() == 10
+    assert (leido["N_DEPARTAMENTO"].iloc[10:] == "CAPITAL").all()
+    assert leido["FEC_SIST"].iloc[0] == pd.Timestamp("2024-01-02")
+    assert leido["FEC_SIST"].iloc[29] == pd.Timestamp("2024-06-13 10:30:00")
+
+
+def test_date_format_is_detected_once_per_file(tmp_path, monkeypatch):
+    # Día/mes: solo el primer bloque permite distinguirlo del orden mes/día
+    monkeypatch.setattr(carga, "CHUNK_FILAS", 10)
+    df = fichas(0, 30)
+    df.loc[:9, "FEC_SIST"] = "13/02/2024"
+    df.loc[10:, "FEC_SIST"] = "01/03/2024"
+    df.loc[29, "FEC_SIST"] = "sin fecha"
+    archivo = tmp_path / BLOB
+    df.to_csv(archivo, index=False)
+    ruta = str(tmp_path / "parte.parquet")
+
+    formatos = {}
+    with open(archivo, "rb") as stream:
+        _, memoria = carga.ingest_csv(stream, ruta, carga.ESQUEMAS[BLOB], formatos=formatos)
+
+    leido = pd.read_parquet(ruta)
+    assert formatos["FEC_SIST"] == "%d/%m/%Y"
+    assert leido["FEC_SIST"].iloc[10] == pd.Timestamp("2024-03-01")
+    assert memoria["invalidas"] == {"FEC_SIST": 1}
+
+
+def test_malformed_ids_do_not_abort_the_ingest(tmp_path):
+    df = fichas(0, 5).astype({"CUIL": object})
+    df.loc[1, "CUIL"] = "20-12345678-9"
+    df.loc[2, "CUIL"] = "sin dato"
+    archivo = tmp_path / BLOB
+    df.to_csv(archivo, index=False)
+    ruta = str(tmp_path / "parte.parquet")
+
+    with open(archivo, "rb") as stream:
+        filas, memoria = carga.ingest_csv(stream, ruta, carga.ESQUEMAS[BLOB])
+
+    leido = pd.read_parquet(ruta)
+    assert filas == 5
+    assert str(leido["CUIL"].dtype) == "Int64"
+    assert leido["CUIL"].iloc[1] == 20123456789
+    assert leido["CUIL"].isna().tolist() == [False, False, True, False, False]
+    assert memoria["invalidas"] == {"CUIL": 1}
@@ -0,0 +1,28 @@
+import pandas as pd
+
+from moduls.cache import artefactos
+from moduls.empresas import quota_engine
+
+
+def test_quota_ignores_null_cuit_and_states_outside_the_cupo():
+    artefactos.clear()
+    empresas = pd.DataFrame({
+        "N_LOCALIDAD": "CAPITAL",
+        "CUIT": pd.array([30_000_000_001, None], dtype="Int64"),
+        "N_EMPRESA": ["EMPRESA 1", "SIN CUIT"],
+        "CANTIDAD_EMPLEADOS": [5.0, 5.0],
+    })
+    # Cupo 2: tres INSCRIPTO, una RECHAZADO y una CTI de la empresa, y dos sin CUIT
+    inscriptos = pd.DataFrame({
+        "CUIT": pd.array([30_000_000_001] * 5 + [None, None], dtype="Int64"),
+        "ID_FICHA": range(7),
+        "ID_EST_FIC": [8, 3, 8, 12, 8, 8, 8],
+        "FEC_SIST": pd.date_range("2024-01-01", periods=7),
+    })
+
+    tabla, fuera_cupo = quota_engine(empresas, inscriptos)
+
+    assert tabla["N_EMPRESA"].tolist() == ["EMPRESA 1"]
+    assert tabla["INSCRIPTOS"].tolist() == [3]
+    assert tabla["CUPO_RESTANTE"].tolist() == [-1]
+    assert fuera_cupo.tolist() == [4]
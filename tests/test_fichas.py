@@ -0,0 +1,21 @@
+import pandas as pd
+
+from moduls.fichas import SIN_MAPEAR, IndiceEstados
+
+
+def test_unmapped_codes_are_reported_apart_from_the_cycle():
+    estados = IndiceEstados(pd.DataFrame({
+        "CUIL": range(6),
+        "ID_EST_FIC": pd.array([8, 8, 12, 3, 4, None], dtype="Int64"),
+    }))
+
+    embudo = estados.funnel(adheridos=10).set_index("Estado")
+    assert embudo.loc[SIN_MAPEAR, "Fichas"] == 2
+    assert embudo.loc["INSCRIPTO", "Alcanzados"] == 3
+
+    conversiones = estados.conversions(adheridos=10)
+    assert list(zip(conversiones["Origen"], conversiones["Destino"])) == [
+        ("ADHERIDO", "INSCRIPTO"),
+        ("INSCRIPTO", "CTI_INSCRIPTO"),
+    ]
+    assert estados.conversions()["Origen"].tolist() == ["INSCRIPTO"]
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from moduls.respuestas import ASPECTOS, PuntajesEncuesta
+
+
+def test_no_selection_averages_each_inscription_over_all_categories():
+    # La inscripción 1 responde en dos categorías con cantidades distintas de filas
+    respuestas = pd.DataFrame({
+        "ID_INSCRIPCION": [1, 1, 1, 2],
+        "CATEGORIA": ["COMERCIO", "COMERCIO", "INDUSTRIA", "COMERCIO"],
+        **{aspecto: [1.0, 2.0, 5.0, 4.0] for aspecto in ASPECTOS},
+    })
+    puntajes = PuntajesEncuesta(respuestas)
+
+    esperado = respuestas.groupby("ID_INSCRIPCION")[ASPECTOS].mean().mean().round(2).to_numpy()
+    promedios = puntajes.averages()
+    assert np.allclose(promedios["Promedio"], esperado)
+    assert (promedios["Inscripciones"] == 2).all()
+    assert puntajes.distribution("CALCULO")["Cantidad"].sum() == 2
+
+    # Con todas las categorías elegidas se promedia por inscripción y categoría
+    assert puntajes.averages(["COMERCIO", "INDUSTRIA"])["Inscripciones"].tolist() == [3] * len(ASPECTOS)